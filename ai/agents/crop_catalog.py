@@ -0,0 +1,58 @@
+# Lookup structures over the crop table, built once per process on first use.
+# Replaces per-request crops_df scans (tolist + boolean masks + .str.lower()).
+import threading
+from functools import lru_cache
+from typing import Optional, Dict, Any, List, Tuple
+
+from rapidfuzz import process, fuzz
+from .model import get_crop_columns, crop_record
+
+class CropCatalog:
+    def __init__(self):
+        columns = get_crop_columns()
+        crops, crops_missing = columns["CROPS"]
+        seasons, seasons_missing = columns["SEASON"] if "SEASON" in columns else (None, None)
+
+        self.names: List[str] = []                              # deduplicated, first-seen order (rapidfuzz choices)
+        self._by_season: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._first: Dict[str, Dict[str, Any]] = {}
+        for i in range(len(crops)):
+            if crops_missing is not None and crops_missing[i]:
+                continue
+            crop = str(crops[i])
+            if crop not in self._first:
+                self.names.append(crop)
+                self._first[crop] = crop_record(i)
+            if seasons is not None and not (seasons_missing is not None and seasons_missing[i]):
+                key = (crop, str(seasons[i]).lower())
+                if key not in self._by_season:  # first row per (crop, season), like season_match.iloc[0]
+                    self._by_season[key] = crop_record(i)
+
+    def match(self, crop_name: str) -> Optional[str]:
+        """Best fuzzy match for a free-text crop name, memoized per input string."""
+        return _match(self, crop_name)
+
+    def row(self, crop: str, season: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Row dict for `crop`, preferring the given season, else the crop's first row."""
+        if season:
+            hit = self._by_season.get((crop, season.lower()))
+            if hit is not None:
+                return dict(hit)
+        first = self._first.get(crop)
+        return dict(first) if first is not None else None
+
+@lru_cache(maxsize=4096)
+def _match(catalog: CropCatalog, crop_name: str) -> Optional[str]:
+    best = process.extractOne(crop_name, catalog.names, scorer=fuzz.WRatio)
+    return best[0] if best else None
+
+_catalog: Optional[CropCatalog] = None
+_lock = threading.Lock()
+
+def get_crop_catalog() -> CropCatalog:
+    global _catalog
+    if _catalog is None:
+        with _lock:
+            if _catalog is None:
+                _catalog = CropCatalog()
+    return _catalog
@@ -0,0 +1,97 @@
+# Pure-NumPy replica of the fitted ColumnTransformer in model/preprocessor.pkl
+# (StandardScaler on SOIL_PH/N/P/K + OneHotEncoder on SOIL/SEASON/TYPE_OF_CROP/WATER_SOURCE).
+# Building a one-row DataFrame and going through sklearn costs milliseconds per
+# request; this produces the same float32 query vector directly from a feature dict.
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+def _is_missing(value: Any) -> bool:
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+class FastEncoder:
+    def __init__(self, n_features: int, numeric: List[Tuple[List[str], slice, Optional[np.ndarray], Optional[np.ndarray]]],
+                 categorical: List[Tuple[str, int, Dict[Any, int], Optional[int]]]):
+        self.n_features = n_features
+        self._numeric = numeric          # (columns, output slice, mean or None, scale or None)
+        self._categorical = categorical  # (column, output offset, category -> position, missing position)
+
+    @classmethod
+    def from_preprocessor(cls, pre) -> "FastEncoder":
+        """
+        Extract scaler statistics and one-hot vocabularies from a fitted ColumnTransformer.
+        Raises NotImplementedError for configurations this encoder does not replicate.
+        """
+        if getattr(pre, "transformer_weights", None):
+            raise NotImplementedError("transformer_weights are not supported")
+        numeric, categorical = [], []
+        n_features = 0
+        for name, trans, cols in pre.transformers_:
+            if trans == "drop" or name == "remainder":
+                continue
+            out = pre.output_indices_[name]
+            n_features = max(n_features, out.stop)
+            kind = type(trans).__name__
+            if kind == "StandardScaler":
+                numeric.append((list(cols), out, trans.mean_, trans.scale_))
+            elif kind == "OneHotEncoder":
+                if trans.drop_idx_ is not None or getattr(trans, "_infrequent_enabled", False):
+                    raise NotImplementedError("drop / infrequent categories are not supported")
+                if trans.handle_unknown != "ignore":
+                    raise NotImplementedError("only handle_unknown='ignore' is supported")
+                offset = out.start
+                for col, cats in zip(cols, trans.categories_):
+                    lookup = {c: i for i, c in enumerate(cats) if not _is_missing(c)}
+                    missing = next((i for i, c in enumerate(cats) if _is_missing(c)), None)
+                    categorical.append((col, offset, lookup, missing))
+                    offset += len(cats)
+            else:
+                raise NotImplementedError(f"Unsupported transformer: {kind}")
+        return cls(n_features, numeric, categorical)
+
+    def encode(self, row: Dict[str, Any]) -> np.ndarray:
+        """Encode one feature dict into a (1, n_features) float32 array."""
+        out = np.zeros(self.n_features, dtype=np.float64)
+        for cols, sl, mean, scale in self._numeric:
+            x = np.array([row.get(c, np.nan) for c in cols], dtype=np.float64)
+            # Same operation order as StandardScaler.transform, so results are bit-identical
+            if mean is not None:
+                x -= mean
+            if scale is not None:
+                x /= scale
+            out[sl] = x
+        for col, offset, lookup, missing in self._categorical:
+            value = row.get(col)
+            pos = missing if _is_missing(value) else lookup.get(value)
+            if pos is not None:
+                out[offset + pos] = 1.0
+        return out.astype(np.float32).reshape(1, -1)
+
+def probe_rows(encoder: FastEncoder, numeric_samples: int = 8, seed: int = 0) -> List[Dict[str, Any]]:
+    """Rows that exercise every category, a missing value per column and random/NaN numerics."""
+    rng = np.random.default_rng(seed)
+    num_cols = [c for cols, _, _, _ in encoder._numeric for c in cols]
+    cat_values = {col: list(lookup) + [None, "__unseen__"] for col, _, lookup, _ in encoder._categorical}
+    width = max([numeric_samples] + [len(v) for v in cat_values.values()])
+    rows = []
+    for i in range(width):
+        row = {c: float(rng.uniform(0, 500)) if i % 5 else np.nan for c in num_cols}
+        for col, values in cat_values.items():
+            row[col] = values[i % len(values)]
+        rows.append(row)
+    return rows
+
+def check_equivalence(encoder: FastEncoder, pre, rows: Optional[List[Dict[str, Any]]] = None) -> bool:
+    """True when the encoder reproduces pre.transform bit-for-bit on `rows` (defaults to probe_rows)."""
+    import pandas as pd
+
+    for row in rows or probe_rows(encoder):
+        expected = pre.transform(pd.DataFrame([row]))
+        if hasattr(expected, "toarray"):
+            expected = expected.toarray()
+        expected = np.asarray(expected).astype(np.float32)
+        got = encoder.encode(row)
+        if expected.shape != got.shape or not np.array_equal(expected.view(np.uint32), got.view(np.uint32)):
+            return False
+    return True
@@ -0,0 +1,138 @@
+# Local-first geocoding for farmer records that lack LAT/LON.
+# Lookup order:
+#   1. bundled centroid table (data/india_centroids.csv, read into memory once); it ships
+#      state rows only, so a district is resolved locally only once its row is added
+#   2. persistent cache of earlier Nominatim answers (SQLite via utils.kvstore, in the temp dir by default)
+#   3. Nominatim itself, rate-limited to its 1 request/second policy
+#   4. the state centroid, if only the district lookup failed
+# District rows can be appended to the CSV; they are picked up on the next process start.
+# A cache that cannot be read or written (read-only disk, locked SQLite) only costs the cache.
+import os, re, time, tempfile, threading
+from typing import Optional, Dict, Tuple
+from urllib.parse import urlencode
+
+import requests
+from utils.kvstore import KVStore
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+CENTROIDS_CSV = os.path.join(DATA_DIR, "india_centroids.csv")
+GEOCODE_CACHE_PATH = os.getenv("GEOCODE_CACHE_PATH", os.path.join(tempfile.gettempdir(), "krishi_mitra_geocode.sqlite3"))
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search?"
+NOMINATIM_MIN_INTERVAL = 1.0
+
+STATE_ALIASES = {
+    "orissa": "odisha",
+    "uttaranchal": "uttarakhand",
+    "pondicherry": "puducherry",
+    "nct of delhi": "delhi",
+    "new delhi": "delhi",
+    "andaman & nicobar islands": "andaman and nicobar islands",
+    "jammu & kashmir": "jammu and kashmir",
+    "dadra and nagar haveli": "dadra and nagar haveli and daman and diu",
+    "daman and diu": "dadra and nagar haveli and daman and diu",
+}
+
+def _norm(name: Optional[str]) -> str:
+    if not name:
+        return ""
+    name = re.sub(r"\s+", " ", str(name).lower().replace("district", "")).strip()
+    return STATE_ALIASES.get(name, name)
+
+class CentroidTable:
+    """(district, state) -> centroid, read from the CSV on first use."""
+
+    def __init__(self):
+        self._index: Optional[Dict[Tuple[str, str], Tuple[float, float]]] = None
+        self._by_district: Dict[str, Optional[Tuple[float, float]]] = {}
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._index is not None:
+                return
+            index = {}
+            with open(CENTROIDS_CSV, encoding="utf-8") as fh:
+                next(fh)  # header
+                for line in fh:
+                    if not line.strip():
+                        continue
+                    district, state, lat, lon = [x.strip() for x in line.rsplit(",", 3)]
+                    key = (_norm(district), _norm(state))
+                    index[key] = (float(lat), float(lon))
+                    if key[0]:
+                        # District names repeat across states; only index unambiguous ones without a state
+                        self._by_district[key[0]] = None if key[0] in self._by_district else index[key]
+            self._index = index
+
+    def lookup(self, district: Optional[str], state: Optional[str]) -> Optional[Dict[str, float]]:
+        if self._index is None:
+            self._load()
+        d, s = _norm(district), _norm(state)
+        row = self._index.get((d, s))
+        if row is None and d and not s:
+            row = self._by_district.get(d)
+        return {"lat": row[0], "lon": row[1]} if row else None
+
+    def state_centroid(self, state: Optional[str]) -> Optional[Dict[str, float]]:
+        return self.lookup(None, state) if state else None
+
+centroids = CentroidTable()
+_remote_cache = KVStore(GEOCODE_CACHE_PATH, table="geocode")
+_nominatim_lock = threading.Lock()
+_last_nominatim_call = 0.0
+_stats = {"table": 0, "cache": 0, "remote": 0, "state_fallback": 0, "failed": 0, "cache_errors": 0}
+
+def _nominatim(query: str) -> Optional[Dict[str, float]]:
+    global _last_nominatim_call
+    with _nominatim_lock:
+        wait = NOMINATIM_MIN_INTERVAL - (time.monotonic() - _last_nominatim_call)
+        if wait > 0:
+            time.sleep(wait)
+        _last_nominatim_call = time.monotonic()
+    url = NOMINATIM_URL + urlencode({"q": query, "format": "json", "limit": 1, "countrycodes": "in"})
+    resp = requests.get(url, headers={"User-Agent": "crop-agent/1.0"}, timeout=10)
+    data = resp.json()
+    return {"lat": float(data[0]["lat"]), "lon": float(data[0]["lon"])} if data else None
+
+def geocode_location(district: Optional[str], state: Optional[str]) -> Optional[Dict[str, float]]:
+    if not district and not state:
+        return None
+    coords = centroids.lookup(district, state)
+    if coords:
+        _stats["table"] += 1
+        return coords
+
+    query = ", ".join([x for x in [district, state, "India"] if x])
+    key = _norm(query)
+    try:
+        cached = _remote_cache.get(key)
+    except Exception as e:
+        print("Geocode cache read failed:", e)
+        _stats["cache_errors"] += 1
+        cached = None
+    if cached is not None:
+        _stats["cache"] += 1
+        coords = cached.get("coords")
+    else:
+        try:
+            coords = _nominatim(query)
+            _stats["remote"] += 1
+        except Exception as e:
+            print("Geocoding failed:", e)
+            coords = None
+        else:
+            try:
+                # Negative answers are cached too so unknown districts are not retried on every request
+                _remote_cache.set(key, {"coords": coords, "fetched_at": time.time()})
+            except Exception as e:
+                print("Geocode cache write failed:", e)
+                _stats["cache_errors"] += 1
+    if coords:
+        return coords
+
+    coords = centroids.state_centroid(state) if district else None
+    _stats["state_fallback" if coords else "failed"] += 1
+    return coords
+
+def get_geocode_stats() -> Dict[str, int]:
+    return dict(_stats)
@@ -0,0 +1,200 @@
+# First-stage intent classifier that runs before the GPT-4 chain in intent_model.
+# Stage 1 is a weighted keyword lexicon, stage 2 an optional small sklearn model
+# trained over the same four labels. Anything below the confidence threshold
+# falls through to the LLM.
+# No stage-2 model ships with the repo: set INTENT_LABEL_LOG to collect the LLM's
+# labels, then train one with
+#   python -m agents.intent_fastpath --train <INTENT_LABEL_LOG file>
+# Until INTENT_MODEL_PATH exists only the lexicon runs.
+import os, re, json, argparse, threading
+from typing import Optional, Dict, Tuple, List
+
+import joblib
+from .crop_catalog import get_crop_catalog
+
+INTENTS = ("pre-sowing", "sowing", "scheme", "general")
+FAST_PATH_THRESHOLD = float(os.getenv("INTENT_FAST_PATH_THRESHOLD", "0.75"))
+# The lexicon is trusted on absolute evidence: the winner needs MIN_LEXICON_SCORE, and
+# confidence is its margin over the runner-up, reaching 1.0 at LEXICON_FULL_MARGIN
+MIN_LEXICON_SCORE = 3.0
+LEXICON_FULL_MARGIN = 4.0
+INTENT_LABEL_LOG = os.getenv("INTENT_LABEL_LOG")  # optional JSONL of LLM-labelled queries
+INTENT_MODEL_PATH = os.getenv(
+    "INTENT_MODEL_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "model", "intent_clf.pkl")
+)
+
+# (phrase, weight) per intent. Multi-word phrases carry more weight than single words.
+LEXICON: Dict[str, List[Tuple[str, float]]] = {
+    "scheme": [
+        ("scheme", 2), ("yojana", 2), ("subsidy", 2), ("insurance", 2), ("pm-kisan", 3), ("pm kisan", 3),
+        ("pmfby", 3), ("fasal bima", 3), ("kisan credit card", 3), ("kcc", 2), ("loan waiver", 3),
+        ("loan", 1), ("compensation", 2), ("relief", 1), ("pension", 2), ("eligibility", 2), ("eligible", 2),
+        ("apply for", 1), ("government", 1), ("govt", 1), ("sarkari", 2), ("installment", 2), ("instalment", 2),
+    ],
+    "pre-sowing": [
+        ("pre-sowing", 4), ("pre sowing", 4), ("presowing", 4), ("before sowing", 4), ("before planting", 4),
+        ("before i sow", 4), ("before we sow", 4), ("seed treatment", 3), ("treat seed", 3),
+        ("which crop", 3), ("what crop", 3), ("best crop", 3), ("crop to grow", 3), ("crop to sow", 3),
+        ("crops to grow", 3), ("crops to sow", 3), ("crop should i", 3), ("recommend", 1),
+        ("soil test", 3), ("soil health", 3), ("soil card", 3), ("shc", 2), ("fertilizer", 1), ("fertiliser", 1),
+        ("land preparation", 3), ("prepare my land", 3), ("prepare land", 3), ("ploughing", 2), ("plowing", 2),
+        ("seed selection", 3), ("choose seed", 3), ("which seed", 2), ("which variety", 2),
+    ],
+    "sowing": [
+        ("how to sow", 3), ("when to sow", 3), ("sowing time", 3), ("sowing method", 3), ("seed rate", 3),
+        ("spacing", 2), ("germination", 2), ("transplant", 2), ("seedling", 2), ("sowing depth", 3),
+        ("sow", 1), ("sowing", 1), ("planting", 1), ("irrigation at", 2),
+    ],
+}
+
+# Sowing words preceded by these belong to pre-sowing ("pre-sowing", "before sowing")
+_NOT_AFTER = {"sowing": r"(?<!pre-)(?<!pre )(?<!before )(?<!before i )(?<!before we )"}
+
+_LEXICON_PATTERNS = {
+    intent: [(re.compile(_NOT_AFTER.get(intent, "") + r"\b" + re.escape(phrase)), weight) for phrase, weight in phrases]
+    for intent, phrases in LEXICON.items()
+}
+
+_stats_lock = threading.Lock()
+_stats = {"total": 0, "lexicon": 0, "model": 0, "cache": 0, "llm": 0}
+
+_crop_pattern: Optional[re.Pattern] = None
+_crop_lookup: Dict[str, str] = {}
+_intent_model = None
+_intent_model_loaded = False
+
+
+def _normalize(query: str) -> str:
+    return re.sub(r"\s+", " ", query.lower()).strip()
+
+def _get_crop_pattern() -> Optional[re.Pattern]:
+    global _crop_pattern, _crop_lookup
+    if _crop_pattern is None:
+        names = {n.strip() for n in get_crop_catalog().names if n.strip()}
+        _crop_lookup = {n.lower(): n for n in names}
+        # Longest names first so "sweet potato" wins over "potato"
+        alternatives = sorted(_crop_lookup, key=len, reverse=True)
+        _crop_pattern = re.compile(r"\b(" + "|".join(re.escape(a) for a in alternatives) + r")\b") if alternatives else None
+    return _crop_pattern
+
+def extract_crop(query: str) -> Optional[str]:
+    """Return the canonical crop name mentioned in the query, if any."""
+    pattern = _get_crop_pattern()
+    if pattern is None:
+        return None
+    m = pattern.search(_normalize(query))
+    return _crop_lookup[m.group(1)] if m else None
+
+def lexicon_scores(query: str) -> Dict[str, float]:
+    text = _normalize(query)
+    return {
+        intent: float(sum(weight for pat, weight in patterns if pat.search(text)))
+        for intent, patterns in _LEXICON_PATTERNS.items()
+    }
+
+def _lexicon_classify(query: str) -> Optional[Tuple[str, float]]:
+    scores = lexicon_scores(query)
+    ranked = sorted(scores.values(), reverse=True)
+    if ranked[0] < MIN_LEXICON_SCORE:
+        return None
+    intent = max(scores, key=scores.get)
+    return intent, min(1.0, (ranked[0] - ranked[1]) / LEXICON_FULL_MARGIN)
+
+def _get_intent_model():
+    global _intent_model, _intent_model_loaded
+    if not _intent_model_loaded:
+        _intent_model = joblib.load(INTENT_MODEL_PATH) if os.path.exists(INTENT_MODEL_PATH) else None
+        _intent_model_loaded = True
+    return _intent_model
+
+def _model_classify(query: str) -> Optional[Tuple[str, float]]:
+    clf = _get_intent_model()
+    if clf is None:
+        return None
+    probs = clf.predict_proba([_normalize(query)])[0]
+    best = int(probs.argmax())
+    return str(clf.classes_[best]), float(probs[best])
+
+def train_intent_model(queries: List[str], labels: List[str], path: str = INTENT_MODEL_PATH):
+    """
+    Fit the stage-2 classifier on labelled queries (e.g. logged GPT-4 labels) and save it.
+    Char n-grams keep it robust to Hinglish spellings and typos.
+    """
+    from sklearn.pipeline import make_pipeline
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+
+    unknown = set(labels) - set(INTENTS)
+    if unknown:
+        raise ValueError(f"Unknown intent labels: {sorted(unknown)}")
+    clf = make_pipeline(
+        TfidfVectorizer(analyzer="char_wb", ngram_range=(2, 4), sublinear_tf=True),
+        LogisticRegression(max_iter=1000, class_weight="balanced"),
+    )
+    clf.fit([_normalize(q) for q in queries], labels)
+    joblib.dump(clf, path)
+
+    global _intent_model, _intent_model_loaded
+    _intent_model, _intent_model_loaded = clf, True
+    return clf
+
+_label_log_lock = threading.Lock()
+
+def log_llm_label(query: str, intent: str):
+    """Append an LLM-labelled query to INTENT_LABEL_LOG (if set) as training data for stage 2."""
+    if not INTENT_LABEL_LOG:
+        return
+    line = json.dumps({"query": query, "intent": intent}, ensure_ascii=False) + "\n"
+    try:
+        with _label_log_lock, open(INTENT_LABEL_LOG, "a", encoding="utf-8") as fh:
+            fh.write(line)
+    except OSError as e:
+        print("Intent label log write failed:", e)
+
+def record_stage(stage: str):
+    with _stats_lock:
+        _stats["total"] += 1
+        _stats[stage] += 1
+
+def fast_classify(query: str, threshold: float = FAST_PATH_THRESHOLD) -> Optional[Dict[str, Optional[str]]]:
+    """
+    Try the local stages in order. Returns {"intent", "crop_name", "stage"} when one of
+    them is confident enough, else None so the caller falls back to the LLM.
+    """
+    for stage, classify in (("lexicon", _lexicon_classify), ("model", _model_classify)):
+        verdict = classify(query)
+        if verdict and verdict[0] in INTENTS and verdict[1] >= threshold:
+            record_stage(stage)
+            return {"intent": verdict[0], "crop_name": extract_crop(query), "stage": stage}
+    return None
+
+def get_intent_stats() -> Dict[str, float]:
+    """Per-stage counts and hit rates since process start."""
+    with _stats_lock:
+        stats = dict(_stats)
+    total = stats["total"] or 1
+    for stage in ("lexicon", "model", "cache", "llm"):
+        stats[f"{stage}_rate"] = stats[stage] / total
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the stage-2 intent classifier from labelled queries")
+    parser.add_argument("--train", required=True, help="JSONL with {\"query\", \"intent\"} per line (e.g. INTENT_LABEL_LOG)")
+    parser.add_argument("--out", default=INTENT_MODEL_PATH)
+    args = parser.parse_args()
+
+    rows = []
+    with open(args.train, encoding="utf-8") as fh:
+        for line in fh:
+            if line.strip():
+                row = json.loads(line)
+                rows.append((row["query"], row["intent"]))
+    # Last label wins for repeated queries
+    labelled = dict(rows)
+    train_intent_model(list(labelled), list(labelled.values()), args.out)
+    counts = {i: list(labelled.values()).count(i) for i in INTENTS}
+    print(f"Trained on {len(labelled)} queries {counts}; saved to {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,12 @@
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 from pydantic import BaseModel, Field
-from typing import Optional, Literal
+from typing import Optional, Literal, Dict
+from collections import OrderedDict
+import os, re, time, threading
+
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer
 
 # schema
 class IntentClass(BaseModel):
@@ -12,6 +17,7 @@ class IntentClass(BaseModel):
     crop_name: Optional[str] = Field(default=None, description="Name of the crop if mentioned explicitly, else null")
 
 from config import OPENAI_API_KEY
+from .intent_fastpath import fast_classify, record_stage, extract_crop, log_llm_label
 
 model = ChatOpenAI(model="gpt-4", api_key=OPENAI_API_KEY, temperature=0)
 
@@ -37,8 +43,132 @@ Return response in structured format.
 structured_model = model.with_structured_output(IntentClass)
 chain = classification_prompt | structured_model
 
-def classify_intent(query: str) -> IntentClass:
-    result = chain.invoke({"query": query})
+# ---- Semantic response cache
+def normalize_query(query: str) -> str:
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s-]", " ", query.lower())).strip()
+
+class IntentCache:
+    """
+    Bounded LRU/TTL cache of LLM classifications.
+    Exact hits are keyed on the normalized text; near-duplicates are found with a
+    cosine search over hashed char n-gram vectors kept in a preallocated matrix.
+    """
+
+    def __init__(self, maxsize: int = 5000, ttl: float = 24 * 3600, threshold: float = 0.92, n_features: int = 512):
+        self.maxsize, self.ttl, self.threshold = maxsize, ttl, threshold
+        self._vectorizer = HashingVectorizer(analyzer="char_wb", ngram_range=(3, 4), n_features=n_features,
+                                             alternate_sign=False, norm="l2")
+        self._vectors = np.zeros((maxsize, n_features), dtype=np.float32)
+        self._slot_keys = [None] * maxsize
+        self._free = list(range(maxsize - 1, -1, -1))
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (slot, expires_at, IntentClass)
+        self._lock = threading.Lock()
+        self.exact_hits = self.semantic_hits = self.misses = 0
+
+    def _embed(self, key: str) -> np.ndarray:
+        return self._vectorizer.transform([key]).toarray()[0].astype(np.float32)
+
+    def _evict(self, key: str):
+        slot, _, _ = self._entries.pop(key)
+        self._vectors[slot] = 0.0
+        self._slot_keys[slot] = None
+        self._free.append(slot)
+
+    def _crop_compatible(self, key: str, query: str, cached: IntentClass) -> bool:
+        # Near-duplicates like "how to sow wheat" / "how to sow rice" must not share a crop
+        if cached.crop_name and cached.crop_name.lower() not in key:
+            return False
+        mentioned = extract_crop(query)
+        return not mentioned or (cached.crop_name or "").lower() == mentioned.lower()
+
+    def get(self, query: str) -> Optional[IntentClass]:
+        key = normalize_query(query)
+        vec = self._embed(key)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[1] > now:
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                return entry[2].model_copy(update={"query": query})
+            if entry:
+                self._evict(key)
+            if self._entries:
+                sims = self._vectors @ vec
+                slot = int(sims.argmax())
+                match_key = self._slot_keys[slot]
+                if match_key is not None and sims[slot] >= self.threshold:
+                    _, expires_at, cached = self._entries[match_key]
+                    if expires_at <= now:
+                        self._evict(match_key)
+                    elif self._crop_compatible(key, query, cached):
+                        self._entries.move_to_end(match_key)
+                        self.semantic_hits += 1
+                        return cached.model_copy(update={"query": query})
+            self.misses += 1
+        return None
+
+    def put(self, query: str, result: IntentClass):
+        key = normalize_query(query)
+        vec = self._embed(key)
+        with self._lock:
+            if key in self._entries:
+                self._evict(key)
+            if not self._free:
+                self._evict(next(iter(self._entries)))
+            slot = self._free.pop()
+            self._vectors[slot] = vec
+            self._slot_keys[slot] = key
+            self._entries[key] = (slot, time.monotonic() + self.ttl, result)
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._evict(key)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            hits = self.exact_hits + self.semantic_hits
+            lookups = hits + self.misses
+            return {
+                "size": len(self._entries),
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+            }
+
+intent_cache = IntentCache(
+    maxsize=int(os.getenv("INTENT_CACHE_SIZE", "5000")),
+    ttl=float(os.getenv("INTENT_CACHE_TTL", str(24 * 3600))),
+    threshold=float(os.getenv("INTENT_CACHE_SIMILARITY", "0.92")),
+)
+
+def _fast_path(query: str) -> Optional[IntentClass]:
+    fast = fast_classify(query)
+    if fast is not None:
+        return IntentClass(intent=fast["intent"], query=query, crop_name=fast["crop_name"])
+    cached = intent_cache.get(query)
+    if cached is not None:
+        record_stage("cache")
+    return cached
+
+def _finalize(query: str, result: IntentClass) -> IntentClass:
+    record_stage("llm")
     if result.intent not in ["pre-sowing", "sowing", "scheme", "general"]:
         result.intent = "general"
-    return result
\ No newline at end of file
+    log_llm_label(query, result.intent)
+    intent_cache.put(query, result)
+    return result
+
+def classify_intent(query: str) -> IntentClass:
+    cached = _fast_path(query)
+    if cached is not None:
+        return cached
+    return _finalize(query, chain.invoke({"query": query}))
+
+async def aclassify_intent(query: str) -> IntentClass:
+    cached = _fast_path(query)
+    if cached is not None:
+        return cached
+    return _finalize(query, await chain.ainvoke({"query": query}))
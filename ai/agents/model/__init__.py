@@ -1,13 +1,148 @@
 import joblib
 import faiss
 import os
+import json
+import time
+import shutil
+import tempfile
+import threading
+
+import numpy as np
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 FAISS_PATH = os.path.join(BASE_DIR, "crop_index.faiss")
 CROPS_PATH = os.path.join(BASE_DIR, "crops_df.pkl")
 PREPROC_PATH = os.path.join(BASE_DIR, "preprocessor.pkl")
+# Columnar copy of crops_df: one .npy per column, memory-mapped so forked workers share pages.
+# Each export goes to its own subdirectory; columns.json names the current one.
+CROPS_COLUMNS_DIR = os.path.join(BASE_DIR, "crops_columns")
+CROPS_COLUMNS_META = os.path.join(CROPS_COLUMNS_DIR, "columns.json")
+CROPS_COLUMNS_KEEP_SECONDS = 3600
+
+# Artifacts are loaded on first use rather than at import time
+_loaded = {}
+_lock = threading.RLock()  # loaders may load other artifacts (crop columns -> crops_df)
+
+def _load_once(name, loader):
+    if name not in _loaded:
+        with _lock:
+            if name not in _loaded:
+                _loaded[name] = loader()
+    return _loaded[name]
+
+def _read_index():
+    flags = faiss.IO_FLAG_MMAP | getattr(faiss, "IO_FLAG_MMAP_IFC", 0) | getattr(faiss, "IO_FLAG_READ_ONLY", 0)
+    try:
+        return faiss.read_index(FAISS_PATH, flags)
+    except RuntimeError:
+        # Index types without mmap support are read into private memory
+        return faiss.read_index(FAISS_PATH)
+
+def get_index():
+    return _load_once("index", _read_index)
+
+def get_preprocessor():
+    return _load_once("pre", lambda: joblib.load(PREPROC_PATH))
+
+def get_crops_df():
+    return _load_once("crops_df", lambda: joblib.load(CROPS_PATH))
+
+def export_crops_columnar(crops_df, directory=CROPS_COLUMNS_DIR):
+    """
+    Write crops_df as one .npy per column. Numeric columns keep their dtype; everything
+    else becomes fixed-width unicode plus a `<col>.missing.npy` mask for None/NaN.
+
+    Columns are written to a fresh subdirectory and published by atomically replacing
+    columns.json, so a worker loading at the same moment sees either the old or the new
+    export in full, never a half-written one.
+    """
+    os.makedirs(directory, exist_ok=True)
+    export_dir = tempfile.mkdtemp(prefix="export-", dir=directory)
+    os.chmod(export_dir, 0o755)
+    meta = []
+    for i, col in enumerate(crops_df.columns):
+        series = crops_df[col]
+        entry = {"name": str(col), "file": f"c{i}.npy", "missing": None}
+        if series.dtype.kind in "biuf":
+            values = series.to_numpy()
+        else:
+            missing = series.isna().to_numpy()
+            values = series.where(~missing, "").astype(str).to_numpy().astype(str)
+            if missing.any():
+                entry["missing"] = f"c{i}.missing.npy"
+                np.save(os.path.join(export_dir, entry["missing"]), missing)
+        np.save(os.path.join(export_dir, entry["file"]), values)
+        meta.append(entry)
+
+    meta_path = os.path.join(directory, "columns.json")
+    try:
+        with open(meta_path, encoding="utf-8") as fh:
+            previous = os.path.join(directory, json.load(fh).get("dir", ""))
+    except (OSError, ValueError):
+        previous = None
+
+    fd, tmp_meta = tempfile.mkstemp(suffix=".json", dir=directory)
+    with os.fdopen(fd, "w", encoding="utf-8") as fh:
+        json.dump({"rows": int(len(crops_df)), "dir": os.path.basename(export_dir), "columns": meta}, fh)
+    os.chmod(tmp_meta, 0o644)
+    os.replace(tmp_meta, meta_path)
+
+    # Drop old exports, keeping the one just superseded (workers may still be opening it)
+    # and recent ones (another worker may still be writing it)
+    cutoff = time.time() - CROPS_COLUMNS_KEEP_SECONDS
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name.startswith("export-") and path not in (export_dir, previous) and os.path.getmtime(path) < cutoff:
+            shutil.rmtree(path, ignore_errors=True)
+
+def _columns_current():
+    try:
+        with open(CROPS_COLUMNS_META, encoding="utf-8") as fh:
+            has_dir = "dir" in json.load(fh)  # exports from before versioned subdirectories lack it
+    except (OSError, ValueError):
+        return False
+    return has_dir and os.path.getmtime(CROPS_COLUMNS_META) >= os.path.getmtime(CROPS_PATH)
+
+def _load_crop_columns():
+    if not _columns_current():
+        try:
+            export_crops_columnar(get_crops_df())
+        except OSError:
+            # Read-only deployment: serve columns from the unpickled DataFrame
+            df = get_crops_df()
+            return {
+                str(c): (df[c].to_numpy(), None if df[c].dtype.kind in "biuf" else df[c].isna().to_numpy())
+                for c in df.columns
+            }
+    with open(CROPS_COLUMNS_META, encoding="utf-8") as fh:
+        meta = json.load(fh)
+    export_dir = os.path.join(CROPS_COLUMNS_DIR, meta["dir"])
+    columns = {}
+    for entry in meta["columns"]:
+        values = np.load(os.path.join(export_dir, entry["file"]), mmap_mode="r")
+        missing = np.load(os.path.join(export_dir, entry["missing"]), mmap_mode="r") if entry["missing"] else None
+        columns[entry["name"]] = (values, missing)
+    return columns
+
+def get_crop_columns():
+    """Column name -> (values, missing mask or None); arrays are memory-mapped."""
+    return _load_once("crop_columns", _load_crop_columns)
+
+def crop_record(i):
+    """Row `i` of the crop table as a plain dict (equivalent to crops_df.iloc[i].to_dict())."""
+    record = {}
+    for name, (values, missing) in get_crop_columns().items():
+        if missing is not None and missing[i]:
+            record[name] = None
+        else:
+            value = values[i]
+            record[name] = value.item() if hasattr(value, "item") else value
+    return record
 
-index = faiss.read_index(FAISS_PATH)
-crops_df = joblib.load(CROPS_PATH)
-pre = joblib.load(PREPROC_PATH)
\ No newline at end of file
+def __getattr__(name):
+    # Backwards compatibility for `from agents.model import index, pre, crops_df`
+    loaders = {"index": get_index, "pre": get_preprocessor, "crops_df": get_crops_df}
+    if name in loaders:
+        return loaders[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
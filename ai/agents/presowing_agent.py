@@ -1,13 +1,18 @@
 # pip install langchain langchain-openai rapidfuzz faiss-cpu joblib pandas numpy requests pymongo
-import os, json, math, datetime as dt
-from typing import Optional, List, Dict, Any
+import os, json, math, time, asyncio, threading, datetime as dt
+from typing import Optional, List, Dict, Any, Iterable, Iterator, AsyncIterator
+from concurrent.futures import ThreadPoolExecutor, Future
 
 import numpy as np
 import pandas as pd
-import requests
-from db import get_user_and_shc
+from db import get_user_and_shc, aget_user_and_shc
 from config import OPENAI_API_KEY, OPENWEATHER_API_KEY, FORECAST_HOURS, TOP_K
-from .model import index, pre, crops_df
+from .model import get_index, get_preprocessor, crop_record
+from .weather_cache import get_weather as cached_weather
+from .geocode import geocode_location
+from .fast_encoder import FastEncoder, check_equivalence
+from .prompt_context import build_context
+from .scheme_helpers.models import StreamDelta
 
 # ---- LangChain
 from langchain_openai import ChatOpenAI
@@ -26,23 +31,7 @@ def detect_season(date: Optional[dt.date] = None) -> str:
         return "zaid"
     return "kharif"
 
-def geocode_location(district: str, state: str) -> Optional[Dict[str,float]]:
-    if not district and not state:
-        return None
-    try:
-        from urllib.parse import urlencode
-        query = ", ".join([x for x in [district, state, "India"] if x])
-        url = "https://nominatim.openstreetmap.org/search?" + urlencode({"q": query, "format": "json", "limit": 1})
-        resp = requests.get(url, headers={"User-Agent":"crop-agent/1.0"}, timeout=10)
-        data = resp.json()
-        if data:
-            return {"lat": float(data[0]["lat"]), "lon": float(data[0]["lon"])}
-    except Exception as e:
-        print("Geocoding failed:", e)
-    return None
-
-def get_farmer_profile(aadhaar_no: str) -> Dict[str, Any]:
-    res = get_user_and_shc(aadhaar_no)
+def _farmer_profile_from(res: Dict[str, Any]) -> Dict[str, Any]:
     if "error" in res:
         return {"error": res["error"]}
     user = res["user"]
@@ -63,8 +52,7 @@ def get_farmer_profile(aadhaar_no: str) -> Dict[str, Any]:
         "raw": user
     }
 
-def get_shc_records(aadhaar_no: str) -> Dict[str, Any]:
-    res = get_user_and_shc(aadhaar_no)
+def _shc_records_from(res: Dict[str, Any]) -> Dict[str, Any]:
     if "error" in res:
         return {"records": []}
     shcs = res["shc_details"]
@@ -72,64 +60,124 @@ def get_shc_records(aadhaar_no: str) -> Dict[str, Any]:
         return {"records": []}
     return {"records": shcs}
 
+def get_farmer_profile(aadhaar_no: str) -> Dict[str, Any]:
+    return _farmer_profile_from(get_user_and_shc(aadhaar_no))
+
+def get_shc_records(aadhaar_no: str) -> Dict[str, Any]:
+    return _shc_records_from(get_user_and_shc(aadhaar_no))
+
+_io_pool = ThreadPoolExecutor(max_workers=int(os.getenv("PRESOWING_IO_WORKERS", "16")),
+                              thread_name_prefix="presowing-io")
+
+def _start_weather(lat: float, lon: float, api_key: str = OPENWEATHER_API_KEY) -> Future:
+    return _io_pool.submit(cached_weather, lat, lon, api_key, FORECAST_HOURS)
+
+def _collect_weather(job: Future) -> Dict[str, Any]:
+    try:
+        return job.result()
+    except Exception as e:
+        return {"error": str(e)}
+
 def get_weather(lat: float, lon: float, api_key: str = OPENWEATHER_API_KEY) -> Dict[str, Any]:
     if not api_key:
         return {"error": "No API key"}
     try:
-        cur = requests.get("https://api.openweathermap.org/data/2.5/weather",
-            params={"lat": lat, "lon": lon, "appid": api_key, "units": "metric"}, timeout=10).json()
-        f = requests.get("https://api.openweathermap.org/data/2.5/forecast",
-            params={"lat": lat, "lon": lon, "appid": api_key, "units": "metric"}, timeout=10).json()
-        out = {"current": cur, "forecast": f}
-        if "list" in f:
-            steps = f["list"][: max(1, FORECAST_HOURS//3)]
-            temps = [s["main"]["temp"] for s in steps if "main" in s]
-            rhs = [s["main"]["humidity"] for s in steps if "main" in s]
-            out["avg_temp"] = float(np.mean(temps)) if temps else None
-            out["avg_rh"] = float(np.mean(rhs)) if rhs else None
-        return out
+        return cached_weather(lat, lon, api_key, FORECAST_HOURS)
     except Exception as e:
         return {"error": str(e)}
 
 # ==============================
 # Recommendations
 # ==============================
+def _feature_row(shc: Dict[str, Any], season: str, irrigation_hint: Optional[str] = None) -> Dict[str, Any]:
+    return {
+        "SOIL_PH": float(shc.get("PH", np.nan)),
+        "N": float(shc.get("N_(KG/HA)", np.nan)),
+        "P": float(shc.get("P_(KG/HA)", np.nan)),
+        "K": float(shc.get("K_(KG/HA)", np.nan)),
+        "SOIL": shc.get("SOIL_TYPE"),
+        "SEASON": season,
+        "TYPE_OF_CROP": None,
+        "WATER_SOURCE": irrigation_hint
+    }
+
+_encoder = None  # FastEncoder once validated, False if it could not replicate `pre`
+_encoder_lock = threading.Lock()
+
+def _get_encoder() -> Optional[FastEncoder]:
+    # Any failure to build or validate the encoder disables it for the process;
+    # requests then use pre.transform and the check is not retried
+    global _encoder
+    if _encoder is None:
+        with _encoder_lock:
+            if _encoder is None:
+                try:
+                    pre = get_preprocessor()
+                    enc = FastEncoder.from_preprocessor(pre)
+                    _encoder = enc if check_equivalence(enc, pre) else False
+                except NotImplementedError as e:
+                    print("Fast encoder unsupported:", e)
+                    _encoder = False
+                except Exception as e:
+                    print(f"Fast encoder setup failed ({type(e).__name__}: {e})")
+                    _encoder = False
+                if _encoder is False:
+                    print("Fast encoder disabled; falling back to pre.transform")
+    return _encoder or None
+
+def _vectorize(rows: List[Dict[str, Any]]) -> np.ndarray:
+    # Single requests skip pandas/sklearn; batches amortize them fine
+    encoder = _get_encoder() if len(rows) == 1 else None
+    if encoder is not None:
+        return encoder.encode(rows[0])
+    Xq = get_preprocessor().transform(pd.DataFrame(rows))
+    if hasattr(Xq, "toarray"):
+        Xq = Xq.toarray()
+    return np.ascontiguousarray(Xq, dtype=np.float32)
+
+def _crop_results(distances: np.ndarray, ids: np.ndarray) -> List[Dict[str, Any]]:
+    results = []
+    for d, i in zip(distances, ids):
+        if i < 0:  # FAISS pads with -1 when fewer than topk crops exist
+            continue
+        rec = crop_record(int(i))
+        rec["_score"] = float(d)
+        results.append(rec)
+    return results
+
 def retrieve_recommendations(aadhaar_no: str, chosen_shc_id: Optional[str] = None,
                              irrigation_hint: Optional[str] = None, topk: int = TOP_K):
-    farmer = get_farmer_profile(aadhaar_no)
+    # One Mongo round trip serves both the profile and the SHC records
+    return _recommendations_from(get_user_and_shc(aadhaar_no), chosen_shc_id, irrigation_hint, topk)
+
+async def aretrieve_recommendations(aadhaar_no: str, chosen_shc_id: Optional[str] = None,
+                                    irrigation_hint: Optional[str] = None, topk: int = TOP_K):
+    res = await aget_user_and_shc(aadhaar_no)
+    # Geocoding, weather and FAISS are blocking; keep them off the event loop
+    return await asyncio.to_thread(_recommendations_from, res, chosen_shc_id, irrigation_hint, topk)
+
+def _recommendations_from(res: Dict[str, Any], chosen_shc_id: Optional[str],
+                          irrigation_hint: Optional[str], topk: int) -> Dict[str, Any]:
+    farmer = _farmer_profile_from(res)
     if "error" in farmer:
         return farmer
-    shcs = get_shc_records(aadhaar_no)
+    shcs = _shc_records_from(res)
     if not shcs["records"]:
         return {"error": "No SHC found"}
     selected_shc = shcs["records"][0] if chosen_shc_id is None else \
         [r for r in shcs["records"] if r.get("SURVEY_NO") == chosen_shc_id][0]
-    weather_info = None
-    if farmer["lat"] and farmer["lon"]:
-        weather_info = get_weather(farmer["lat"], farmer["lon"])
+    has_coords = bool(farmer["lat"] and farmer["lon"])
+    # Weather runs in the background while the FAISS lookup happens below
+    weather_job = _start_weather(farmer["lat"], farmer["lon"]) if has_coords and OPENWEATHER_API_KEY else None
     season = detect_season()
 
-    row = {
-        "SOIL_PH": float(selected_shc.get("PH", np.nan)),
-        "N": float(selected_shc.get("N_(KG/HA)", np.nan)),
-        "P": float(selected_shc.get("P_(KG/HA)", np.nan)),
-        "K": float(selected_shc.get("K_(KG/HA)", np.nan)),
-        "SOIL": selected_shc.get("SOIL_TYPE"),
-        "SEASON": season,
-        "TYPE_OF_CROP": None,
-        "WATER_SOURCE": irrigation_hint
-    }
-    df_row = pd.DataFrame([row])
-    Xq = pre.transform(df_row)
-    if hasattr(Xq, "toarray"):
-        Xq = Xq.toarray().astype(np.float32)
+    Xq = _vectorize([_feature_row(selected_shc, season, irrigation_hint)])
+    D, I = get_index().search(Xq, topk)
+    results = _crop_results(D[0], I[0])
 
-    D, I = index.search(Xq, topk)
-    results = []
-    for d, i in zip(D[0], I[0]):
-        rec = crops_df.iloc[i].to_dict()
-        rec["_score"] = float(d)
-        results.append(rec)
+    weather_info = None
+    if has_coords:
+        weather_info = _collect_weather(weather_job) if weather_job else {"error": "No API key"}
 
     return {
         "farmer": farmer,
@@ -139,6 +187,37 @@ def retrieve_recommendations(aadhaar_no: str, chosen_shc_id: Optional[str] = Non
         "recommendations": results
     }
 
+def recommend_crops_batch(shc_records: Iterable[Dict[str, Any]], season: Optional[str] = None,
+                          irrigation_hint: Optional[str] = None, topk: int = TOP_K,
+                          batch_size: int = 4096) -> Iterator[Dict[str, Any]]:
+    """
+    Top-K crops for many SHC records, e.g. for nightly advisory campaigns.
+    Records are vectorized and searched `batch_size` at a time (one pre.transform
+    and one index.search per batch) and results are yielded per record in input order.
+    A record's own non-empty WATER_SOURCE overrides `irrigation_hint`.
+    """
+    season = season or detect_season()
+    batch: List[Dict[str, Any]] = []
+
+    def flush():
+        Xq = _vectorize([_feature_row(shc, season, shc.get("WATER_SOURCE") or irrigation_hint) for shc in batch])
+        D, I = get_index().search(Xq, topk)
+        for shc, d_row, i_row in zip(batch, D, I):
+            yield {
+                "aadhaar_no": shc.get("AADHAAR_NO"),
+                "survey_no": shc.get("SURVEY_NO"),
+                "season": season,
+                "recommendations": _crop_results(d_row, i_row)
+            }
+
+    for shc in shc_records:
+        batch.append(shc)
+        if len(batch) >= batch_size:
+            yield from flush()
+            batch = []
+    if batch:
+        yield from flush()
+
 # ==============================
 # LLM Setup
 # ==============================
@@ -148,11 +227,13 @@ response_prompt = ChatPromptTemplate.from_messages([
     ("system", "You are a friendly agricultural advisor. Write concise, farmer-friendly advice based on JSON."),
     ("human", "Here is the JSON: {json_str}")
 ])
-response_chain = response_prompt | llm | StrOutputParser()
+# Chains stop at the AIMessage (no StrOutputParser) so token usage stays visible
+response_chain = response_prompt | llm
 
 def format_recommendation_text(structured: Dict[str, Any]) -> str:
-    json_str = json.dumps(structured, ensure_ascii=False)
-    return response_chain.invoke({"json_str": json_str})
+    # Compact, token-budgeted summary instead of the raw weather/Mongo JSON
+    json_str, _ = build_context(structured)
+    return response_chain.invoke({"json_str": json_str}).content
 
 # ==============================
 # Refiner
@@ -163,10 +244,92 @@ refine_prompt = ChatPromptTemplate.from_messages([
 Keep language simple, use short sentences or bullets."""),
     ("user", "User Query: {query}\n\nDraft Message: {draft}\n\nRefined Farmer Response:")
 ])
-refine_chain = refine_prompt | refiner | StrOutputParser()
+refine_chain = refine_prompt | refiner
 
 def refine_farmer_text(query: str, draft: str) -> str:
-    return refine_chain.invoke({"query": query, "draft": draft})
+    return refine_chain.invoke({"query": query, "draft": draft}).content
+
+# ==============================
+# Single-pass generation
+# ==============================
+# "single": one call over the compact context. "two_stage": format + refine over the
+# same context, kept for A/B quality comparison.
+CROP_AGENT_MODE = os.getenv("CROP_AGENT_MODE", "single")
+
+single_pass_prompt = ChatPromptTemplate.from_messages([
+    ("system", """You are KrishiMitra, a friendly agricultural advisor for Indian farmers.
+Using only the context, answer the farmer's query with concise, practical crop advice.
+Mention the recommended crops, key soil nutrient actions and any weather caution.
+Keep language simple, use short sentences or bullets."""),
+    ("user", "User Query: {query}\n\nContext (JSON): {context}\n\nFarmer Response:")
+])
+single_pass_chain = single_pass_prompt | refiner
+# stream_usage makes the last streamed chunk carry token usage
+single_pass_stream_chain = single_pass_prompt | refiner.bind(stream_usage=True)
+
+_generation_lock = threading.Lock()
+_generation_stats = {
+    mode: {"calls": 0, "llm_calls": 0, "latency_ms": 0.0, "input_tokens": 0, "output_tokens": 0}
+    for mode in ("single", "two_stage")
+}
+
+# Fail at import (deploy time) on a misconfigured default rather than on every request
+if CROP_AGENT_MODE not in _generation_stats:
+    raise ValueError(f"Invalid CROP_AGENT_MODE '{CROP_AGENT_MODE}'; expected one of {sorted(_generation_stats)}")
+
+def _usage(*messages) -> Dict[str, int]:
+    usage = {"input_tokens": 0, "output_tokens": 0}
+    for m in messages:
+        for k in usage:
+            usage[k] += (getattr(m, "usage_metadata", None) or {}).get(k, 0)
+    return usage
+
+def _record_generation(mode: str, started: float, messages, context: Dict[str, Any]) -> Dict[str, Any]:
+    metrics = {"mode": mode, "llm_calls": len(messages),
+               "latency_ms": (time.perf_counter() - started) * 1000, **_usage(*messages), "context": context}
+    with _generation_lock:
+        stats = _generation_stats[mode]
+        stats["calls"] += 1
+        for k in ("llm_calls", "latency_ms", "input_tokens", "output_tokens"):
+            stats[k] += metrics[k]
+    return metrics
+
+def get_generation_stats() -> Dict[str, Dict[str, float]]:
+    """Per-mode averages for comparing single-pass and two-stage generation."""
+    with _generation_lock:
+        snapshot = {mode: dict(stats) for mode, stats in _generation_stats.items()}
+    for stats in snapshot.values():
+        n = stats["calls"] or 1
+        for k in ("llm_calls", "latency_ms", "input_tokens", "output_tokens"):
+            stats[f"avg_{k}"] = stats[k] / n
+    return snapshot
+
+def _resolve_mode(mode: Optional[str]) -> str:
+    # CROP_AGENT_MODE is validated at import; this only rejects explicit bad modes
+    mode = mode or CROP_AGENT_MODE
+    if mode not in _generation_stats:
+        raise ValueError(f"Unknown crop agent mode '{mode}'; expected one of {sorted(_generation_stats)}")
+    return mode
+
+def _generate(mode: str, user_query: str, recs_out: Dict[str, Any]):
+    started = time.perf_counter()
+    context, report = build_context(recs_out)
+    if mode == "two_stage":
+        draft = response_chain.invoke({"json_str": context})
+        final = refine_chain.invoke({"query": user_query, "draft": draft.content})
+        return draft.content, final.content, _record_generation(mode, started, [draft, final], report)
+    final = single_pass_chain.invoke({"query": user_query, "context": context})
+    return None, final.content, _record_generation(mode, started, [final], report)
+
+async def _agenerate(mode: str, user_query: str, recs_out: Dict[str, Any]):
+    started = time.perf_counter()
+    context, report = build_context(recs_out)
+    if mode == "two_stage":
+        draft = await response_chain.ainvoke({"json_str": context})
+        final = await refine_chain.ainvoke({"query": user_query, "draft": draft.content})
+        return draft.content, final.content, _record_generation(mode, started, [draft, final], report)
+    final = await single_pass_chain.ainvoke({"query": user_query, "context": context})
+    return None, final.content, _record_generation(mode, started, [final], report)
 
 # ==============================
 # Tools
@@ -246,23 +409,66 @@ def build_agent(verbose: bool = False):
 # ==============================
 # Run Agent
 # ==============================
-def run_crop_agent(user_query: str, aadhaar_no: str, chosen_shc_id: Optional[str] = None):
-    recs_out = retrieve_recommendations(aadhaar_no, chosen_shc_id)
-    if "error" in recs_out:
-        return {"status": "error", "message": recs_out["error"]}
-    draft_text = format_recommendation_text(recs_out)
-    final_text = refine_farmer_text(user_query, draft_text)
+def _crop_agent_meta(recs_out: Dict[str, Any]) -> Dict[str, Any]:
     farmer = recs_out["farmer"]
-    season = recs_out["season"]
+    return {
+        "farmer_name": farmer.get("name"),
+        "district": farmer.get("district"),
+        "state": farmer.get("state"),
+        "season": recs_out["season"]
+    }
+
+def _crop_agent_response(recs_out: Dict[str, Any], draft_text: Optional[str], final_text: str,
+                         generation: Dict[str, Any]) -> Dict[str, Any]:
     return {
         "status": "ok",
         "text": final_text,
         "draft": draft_text,
         "json": recs_out,
-        "meta": {
-            "farmer_name": farmer.get("name"),
-            "district": farmer.get("district"),
-            "state": farmer.get("state"),
-            "season": season
-        }
+        "meta": {**_crop_agent_meta(recs_out), "generation": generation}
     }
+
+def run_crop_agent(user_query: str, aadhaar_no: str, chosen_shc_id: Optional[str] = None,
+                   mode: Optional[str] = None):
+    mode = _resolve_mode(mode)
+    recs_out = retrieve_recommendations(aadhaar_no, chosen_shc_id)
+    if "error" in recs_out:
+        return {"status": "error", "message": recs_out["error"]}
+    draft_text, final_text, generation = _generate(mode, user_query, recs_out)
+    return _crop_agent_response(recs_out, draft_text, final_text, generation)
+
+async def arun_crop_agent(user_query: str, aadhaar_no: str, chosen_shc_id: Optional[str] = None,
+                          mode: Optional[str] = None):
+    mode = _resolve_mode(mode)
+    recs_out = await aretrieve_recommendations(aadhaar_no, chosen_shc_id)
+    if "error" in recs_out:
+        return {"status": "error", "message": recs_out["error"]}
+    draft_text, final_text, generation = await _agenerate(mode, user_query, recs_out)
+    return _crop_agent_response(recs_out, draft_text, final_text, generation)
+
+async def astream_crop_agent(user_query: str, aadhaar_no: str,
+                             chosen_shc_id: Optional[str] = None) -> AsyncIterator[StreamDelta]:
+    """
+    Streaming variant of arun_crop_agent (always single-pass): the structured
+    recommendations as one "data" delta, then the advice as "text" deltas, then
+    the generation metrics as a final "data" delta.
+    """
+    recs_out = await aretrieve_recommendations(aadhaar_no, chosen_shc_id)
+    if "error" in recs_out:
+        yield StreamDelta(content=recs_out["error"], delta_type="error")
+        return
+    yield StreamDelta(delta_type="data", metadata={
+        "shc_used": recs_out["shc_used"].get("SURVEY_NO"),
+        "recommendations": recs_out["recommendations"],
+        "meta": _crop_agent_meta(recs_out)
+    })
+
+    started = time.perf_counter()
+    context, report = build_context(recs_out)
+    final = None
+    async for chunk in single_pass_stream_chain.astream({"query": user_query, "context": context}):
+        final = chunk if final is None else final + chunk  # merging chunks also merges usage
+        if chunk.content:
+            yield StreamDelta(content=chunk.content)
+    messages = [final] if final is not None else []
+    yield StreamDelta(delta_type="data", metadata={"generation": _record_generation("single", started, messages, report)})
@@ -0,0 +1,166 @@
+# Compact, token-budgeted LLM context for the crop agent.
+# retrieve_recommendations output carries the raw OpenWeather payloads (the 5-day
+# forecast alone is 40 steps) plus the Mongo documents; serialized as-is that is
+# thousands of prompt tokens. build_context reduces it to a fixed schema of
+# aggregated forecast stats, soil nutrients and top crops, then trims detail in a
+# fixed order until the serialized context fits CONTEXT_TOKEN_BUDGET.
+# Measuring the savings means tokenizing the full raw payload, so that is only
+# done for a CONTEXT_RAW_TOKENS_SAMPLE fraction of requests (1 for every request).
+import os, json, random, threading
+from typing import Optional, Dict, Any, List, Tuple, Callable
+
+from config import FORECAST_HOURS
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "400"))
+CONTEXT_TOKENIZER_MODEL = os.getenv("CONTEXT_TOKENIZER_MODEL", "gpt-4o-mini")
+CONTEXT_RAW_TOKENS_SAMPLE = float(os.getenv("CONTEXT_RAW_TOKENS_SAMPLE", "0.01"))
+
+# Context key -> SHC field
+SOIL_FIELDS = {
+    "survey_no": "SURVEY_NO",
+    "soil_type": "SOIL_TYPE",
+    "ph": "PH",
+    "n_kg_ha": "N_(KG/HA)",
+    "p_kg_ha": "P_(KG/HA)",
+    "k_kg_ha": "K_(KG/HA)",
+}
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+def _get_encoding():
+    # tiktoken downloads/loads its BPE ranks on first use, so do it once per process
+    global _encoding
+    if _encoding is None:
+        with _encoding_lock:
+            if _encoding is None:
+                import tiktoken
+                try:
+                    _encoding = tiktoken.encoding_for_model(CONTEXT_TOKENIZER_MODEL)
+                except KeyError:
+                    _encoding = tiktoken.get_encoding("o200k_base")
+    return _encoding
+
+def count_tokens(text: str) -> int:
+    return len(_get_encoding().encode(text, disallowed_special=()))
+
+def _dumps(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+def _num(value: Any, ndigits: int = 1) -> Optional[float]:
+    try:
+        return round(float(value), ndigits)
+    except (TypeError, ValueError):
+        return None
+
+def summarize_forecast(weather: Optional[Dict[str, Any]], forecast_hours: int = FORECAST_HOURS) -> Optional[Dict[str, Any]]:
+    """Aggregate current conditions and the next `forecast_hours` of 3-hour forecast steps."""
+    if not weather or "error" in weather:
+        return None
+    current = weather.get("current") or {}
+    steps = (weather.get("forecast") or {}).get("list", [])[: max(1, forecast_hours // 3)]
+    temps = [s["main"]["temp"] for s in steps if "temp" in (s.get("main") or {})]
+    rhs = [s["main"]["humidity"] for s in steps if "humidity" in (s.get("main") or {})]
+    rain = [(s.get("rain") or {}).get("3h", 0.0) for s in steps]
+    rainy = [s for s, mm in zip(steps, rain)
+             if mm > 0 or "rain" in ((s.get("weather") or [{}])[0].get("main") or "").lower()]
+    winds = [(s.get("wind") or {}).get("speed") for s in steps if (s.get("wind") or {}).get("speed") is not None]
+    return {
+        "now": ((current.get("weather") or [{}])[0]).get("description"),
+        "now_temp_c": _num((current.get("main") or {}).get("temp")),
+        "hours": len(steps) * 3,
+        "temp_min_c": _num(min(temps)) if temps else None,
+        "temp_max_c": _num(max(temps)) if temps else None,
+        "temp_avg_c": _num(sum(temps) / len(temps)) if temps else None,
+        "humidity_avg": _num(sum(rhs) / len(rhs), 0) if rhs else None,
+        "rain_mm": _num(sum(rain)),
+        "rain_expected": bool(rainy),
+        "rain_hours": len(rainy) * 3,
+        "wind_max_ms": _num(max(winds)) if winds else None,
+    }
+
+def compact_context(recs_out: Dict[str, Any]) -> Dict[str, Any]:
+    """Fixed-schema summary of a retrieve_recommendations result; missing values are None."""
+    farmer, shc = recs_out.get("farmer") or {}, recs_out.get("shc_used") or {}
+    return {
+        "location": {"district": farmer.get("district"), "state": farmer.get("state")},
+        "season": recs_out.get("season"),
+        "soil": {key: shc.get(field) for key, field in SOIL_FIELDS.items()},
+        "weather": summarize_forecast(recs_out.get("weather")),
+        "top_crops": [
+            {"crop": r.get("CROPS"), "season": r.get("SEASON"), "type": r.get("TYPE_OF_CROP"),
+             "score": _num(r.get("_score"), 3)}
+            for r in recs_out.get("recommendations", [])
+        ],
+    }
+
+# ---- Budget enforcement
+# Each step removes detail the advice can live without, least important first.
+def _drop_crop_details(ctx: Dict[str, Any]):
+    ctx["top_crops"] = [{"crop": c["crop"], "score": c["score"]} for c in ctx["top_crops"]]
+
+def _drop_weather_details(ctx: Dict[str, Any]):
+    if ctx["weather"]:
+        ctx["weather"] = {k: ctx["weather"][k] for k in ("temp_avg_c", "rain_mm", "rain_expected")}
+
+def _keep_top_crops(n: int) -> Callable[[Dict[str, Any]], None]:
+    def trim(ctx: Dict[str, Any]):
+        ctx["top_crops"] = ctx["top_crops"][:n]
+    return trim
+
+TRIM_STEPS: List[Tuple[str, Callable[[Dict[str, Any]], None]]] = [
+    ("crop_details", _drop_crop_details),
+    ("weather_details", _drop_weather_details),
+    ("top_crops_3", _keep_top_crops(3)),
+    ("top_crops_1", _keep_top_crops(1)),
+]
+
+_stats_lock = threading.Lock()
+_stats = {"requests": 0, "context_tokens": 0, "sampled": 0, "raw_tokens": 0, "saved_tokens": 0, "trimmed": 0, "over_budget": 0}
+
+def build_context(recs_out: Dict[str, Any], budget: int = CONTEXT_TOKEN_BUDGET) -> Tuple[str, Dict[str, Any]]:
+    """
+    Serialized compact context for the LLM plus a report: context tokens, trim steps
+    applied and, on sampled requests, raw tokens and tokens saved versus json.dumps(recs_out)
+    (None otherwise).
+    """
+    ctx = compact_context(recs_out)
+    text = _dumps(ctx)
+    tokens = count_tokens(text)
+    trimmed = []
+    for name, step in TRIM_STEPS:
+        if tokens <= budget:
+            break
+        step(ctx)
+        text = _dumps(ctx)
+        tokens = count_tokens(text)
+        trimmed.append(name)
+
+    raw_tokens = None
+    if random.random() < CONTEXT_RAW_TOKENS_SAMPLE:
+        raw_tokens = count_tokens(json.dumps(recs_out, ensure_ascii=False, default=str))
+    report = {
+        "context_tokens": tokens,
+        "raw_tokens": raw_tokens,
+        "saved_tokens": raw_tokens - tokens if raw_tokens is not None else None,
+        "budget": budget,
+        "trimmed": trimmed,
+        "over_budget": tokens > budget,
+    }
+    with _stats_lock:
+        _stats["requests"] += 1
+        _stats["context_tokens"] += tokens
+        if raw_tokens is not None:
+            _stats["sampled"] += 1
+            _stats["raw_tokens"] += raw_tokens
+            _stats["saved_tokens"] += report["saved_tokens"]
+        _stats["trimmed"] += bool(trimmed)
+        _stats["over_budget"] += report["over_budget"]
+    return text, report
+
+def get_context_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["avg_context_tokens"] = stats["context_tokens"] / (stats["requests"] or 1)
+    stats["avg_saved_tokens"] = stats["saved_tokens"] / (stats["sampled"] or 1)
+    return stats
@@ -4,14 +4,16 @@ Database utilities for PostgreSQL connection and operations.
 
 import os
 import json
+import struct
 import asyncio
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Union
 from datetime import datetime, timedelta, timezone
 from contextlib import asynccontextmanager
 from uuid import UUID
 import logging
 
 import asyncpg
+import numpy as np
 from asyncpg.pool import Pool
 from dotenv import load_dotenv
 
@@ -20,6 +22,62 @@ load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Schema the pgvector extension was created in
+PGVECTOR_SCHEMA = os.getenv("PGVECTOR_SCHEMA", "public")
+
+
+# Type codecs registered on every pooled connection
+def _encode_vector(value) -> bytes:
+    """pgvector binary format: uint16 dim, uint16 unused, dim big-endian float4."""
+    array = np.asarray(value, dtype=">f4")
+    return struct.pack(">HH", array.shape[0], 0) + array.tobytes()
+
+
+def _decode_vector(data: bytes) -> np.ndarray:
+    dim, _ = struct.unpack_from(">HH", data)
+    return np.frombuffer(data, dtype=">f4", count=dim, offset=4).astype(np.float32)
+
+
+def _encode_jsonb(value) -> bytes:
+    # jsonb binary format is a version byte followed by the JSON text
+    return b"\x01" + json.dumps(value).encode("utf-8")
+
+
+def _decode_jsonb(data: bytes):
+    return json.loads(data[1:])
+
+
+async def _init_connection(conn: asyncpg.Connection):
+    """
+    Register binary codecs so vectors travel as float32 buffers instead of text
+    literals, and json/jsonb values arrive as Python objects.
+    
+    Args:
+        conn: New pool connection
+    
+    Raises:
+        RuntimeError: If the pgvector type is missing, since vector queries pass
+            raw arrays that only the binary codec can send
+    """
+    await conn.set_type_codec(
+        "jsonb", schema="pg_catalog", format="binary",
+        encoder=_encode_jsonb, decoder=_decode_jsonb
+    )
+    await conn.set_type_codec(
+        "json", schema="pg_catalog", format="text",
+        encoder=json.dumps, decoder=json.loads
+    )
+    try:
+        await conn.set_type_codec(
+            "vector", schema=PGVECTOR_SCHEMA, format="binary",
+            encoder=_encode_vector, decoder=_decode_vector
+        )
+    except ValueError as e:
+        raise RuntimeError(
+            f"pgvector type not found in schema '{PGVECTOR_SCHEMA}'; "
+            "install the vector extension or set PGVECTOR_SCHEMA"
+        ) from e
+
 
 class DatabasePool:
     """Manages PostgreSQL connection pool."""
@@ -45,7 +103,8 @@ class DatabasePool:
                 min_size=5,
                 max_size=20,
                 max_inactive_connection_lifetime=300,
-                command_timeout=60
+                command_timeout=60,
+                init=_init_connection
             )
             logger.info("Database connection pool initialized")
     
@@ -107,7 +166,7 @@ async def create_session(
             RETURNING id::text
             """,
             user_id,
-            json.dumps(metadata or {}),
+            metadata or {},
             expires_at
         )
         
@@ -145,7 +204,7 @@ async def get_session(session_id: str) -> Optional[Dict[str, Any]]:
             return {
                 "id": result["id"],
                 "user_id": result["user_id"],
-                "metadata": json.loads(result["metadata"]),
+                "metadata": result["metadata"],
                 "created_at": result["created_at"].isoformat(),
                 "updated_at": result["updated_at"].isoformat(),
                 "expires_at": result["expires_at"].isoformat() if result["expires_at"] else None
@@ -174,7 +233,7 @@ async def update_session(session_id: str, metadata: Dict[str, Any]) -> bool:
             AND (expires_at IS NULL OR expires_at > CURRENT_TIMESTAMP)
             """,
             session_id,
-            json.dumps(metadata)
+            metadata
         )
         
         return result.split()[-1] != "0"
@@ -209,7 +268,7 @@ async def add_message(
             session_id,
             role,
             content,
-            json.dumps(metadata or {})
+            metadata or {}
         )
         
         return result["id"]
@@ -252,13 +311,68 @@ async def get_session_messages(
                 "id": row["id"],
                 "role": row["role"],
                 "content": row["content"],
-                "metadata": json.loads(row["metadata"]),
+                "metadata": row["metadata"],
                 "created_at": row["created_at"].isoformat()
             }
             for row in results
         ]
 
 
+async def get_user_session(user_id: str) -> Optional[str]:
+    """
+    Get the most recent active session for a user.
+    
+    Args:
+        user_id: User identifier
+    
+    Returns:
+        Session ID or None if the user has no unexpired session
+    """
+    async with db_pool.acquire() as conn:
+        return await conn.fetchval(
+            """
+            SELECT id::text
+            FROM sessions
+            WHERE user_id = $1
+            AND (expires_at IS NULL OR expires_at > CURRENT_TIMESTAMP)
+            ORDER BY updated_at DESC
+            LIMIT 1
+            """,
+            user_id
+        )
+
+
+async def get_recent_session_messages(session_id: str, limit: int) -> List[Dict[str, str]]:
+    """
+    Get the latest messages for a session.
+    
+    Args:
+        session_id: Session UUID
+        limit: Number of most recent messages to return
+    
+    Returns:
+        Role and content of the latest messages, oldest first
+    """
+    async with db_pool.acquire() as conn:
+        results = await conn.fetch(
+            """
+            SELECT role, content
+            FROM (
+                SELECT role, content, created_at
+                FROM messages
+                WHERE session_id = $1::uuid
+                ORDER BY created_at DESC
+                LIMIT $2
+            ) recent
+            ORDER BY created_at
+            """,
+            session_id,
+            limit
+        )
+        
+        return [{"role": row["role"], "content": row["content"]} for row in results]
+
+
 # Document Management Functions
 async def get_document(document_id: str) -> Optional[Dict[str, Any]]:
     """
@@ -293,7 +407,7 @@ async def get_document(document_id: str) -> Optional[Dict[str, Any]]:
                 "title": result["title"],
                 "source": result["source"],
                 "content": result["content"],
-                "metadata": json.loads(result["metadata"]),
+                "metadata": result["metadata"],
                 "created_at": result["created_at"].isoformat(),
                 "updated_at": result["updated_at"].isoformat()
             }
@@ -336,7 +450,7 @@ async def list_documents(
         
         if metadata_filter:
             conditions.append(f"d.metadata @> ${len(params) + 1}::jsonb")
-            params.append(json.dumps(metadata_filter))
+            params.append(metadata_filter)
         
         if conditions:
             query += " WHERE " + " AND ".join(conditions)
@@ -356,7 +470,7 @@ async def list_documents(
                 "id": row["id"],
                 "title": row["title"],
                 "source": row["source"],
-                "metadata": json.loads(row["metadata"]),
+                "metadata": row["metadata"],
                 "created_at": row["created_at"].isoformat(),
                 "updated_at": row["updated_at"].isoformat(),
                 "chunk_count": row["chunk_count"]
@@ -367,7 +481,7 @@ async def list_documents(
 
 # Vector Search Functions
 async def vector_search(
-    embedding: List[float],
+    embedding: Union[List[float], np.ndarray],
     limit: int = 10
 ) -> List[Dict[str, Any]]:
     """
@@ -381,13 +495,9 @@ async def vector_search(
         List of matching chunks ordered by similarity (best first)
     """
     async with db_pool.acquire() as conn:
-        # Convert embedding to PostgreSQL vector string format
-        # PostgreSQL vector format: '[1.0,2.0,3.0]' (no spaces after commas)
-        embedding_str = '[' + ','.join(map(str, embedding)) + ']'
-        
         results = await conn.fetch(
             "SELECT * FROM match_chunks($1::vector, $2)",
-            embedding_str,
+            embedding,
             limit
         )
         
@@ -397,7 +507,7 @@ async def vector_search(
                 "document_id": row["document_id"],
                 "content": row["content"],
                 "similarity": row["similarity"],
-                "metadata": json.loads(row["metadata"]),
+                "metadata": row["metadata"],
                 "document_title": row["document_title"],
                 "document_source": row["document_source"]
             }
@@ -406,7 +516,7 @@ async def vector_search(
 
 
 async def hybrid_search(
-    embedding: List[float],
+    embedding: Union[List[float], np.ndarray],
     query_text: str,
     limit: int = 10,
     text_weight: float = 0.3
@@ -424,13 +534,9 @@ async def hybrid_search(
         List of matching chunks ordered by combined score (best first)
     """
     async with db_pool.acquire() as conn:
-        # Convert embedding to PostgreSQL vector string format
-        # PostgreSQL vector format: '[1.0,2.0,3.0]' (no spaces after commas)
-        embedding_str = '[' + ','.join(map(str, embedding)) + ']'
-        
         results = await conn.fetch(
             "SELECT * FROM hybrid_search($1::vector, $2, $3, $4)",
-            embedding_str,
+            embedding,
             query_text,
             limit,
             text_weight
@@ -444,7 +550,7 @@ async def hybrid_search(
                 "combined_score": row["combined_score"],
                 "vector_similarity": row["vector_similarity"],
                 "text_similarity": row["text_similarity"],
-                "metadata": json.loads(row["metadata"]),
+                "metadata": row["metadata"],
                 "document_title": row["document_title"],
                 "document_source": row["document_source"]
             }
@@ -474,7 +580,7 @@ async def get_document_chunks(document_id: str) -> List[Dict[str, Any]]:
                 "chunk_id": row["chunk_id"],
                 "content": row["content"],
                 "chunk_index": row["chunk_index"],
-                "metadata": json.loads(row["metadata"])
+                "metadata": row["metadata"]
             }
             for row in results
         ]
@@ -0,0 +1,228 @@
+"""
+Two-tier cache for query embeddings.
+
+Tier 1 is an in-process LRU, tier 2 an `embedding_cache` table in the same
+PostgreSQL database as the documents, so every worker shares what any worker
+has paid for. Keys are the embedding model plus the normalized text, and
+concurrent requests for the same key share a single embeddings API call.
+"""
+
+import os
+import time
+import hashlib
+import asyncio
+import logging
+import threading
+import unicodedata
+from typing import List, Dict, Any, Optional, Tuple, Callable, Awaitable
+
+import numpy as np
+from cachetools import LRUCache
+
+from .db_utils import db_pool
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
+# "postgres" adds the shared persistent tier, "memory" keeps only the in-process LRU
+EMBEDDING_CACHE_BACKEND = os.getenv("EMBEDDING_CACHE_BACKEND", "postgres")
+
+CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS embedding_cache (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    embedding REAL[] NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize text so trivially different queries share an embedding.
+
+    Args:
+        text: Raw query text
+
+    Returns:
+        NFKC-normalized, lower-cased text with collapsed whitespace
+    """
+    return " ".join(unicodedata.normalize("NFKC", text).lower().split())
+
+
+def cache_key(model: str, normalized: str) -> str:
+    """Stable key for a model and normalized text."""
+    return hashlib.sha256(f"{model}\x00{normalized}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """In-process LRU in front of an optional Postgres table, with in-flight deduplication."""
+
+    def __init__(self, maxsize: int = EMBEDDING_CACHE_SIZE, backend: str = EMBEDDING_CACHE_BACKEND):
+        """
+        Initialize the cache.
+
+        Args:
+            maxsize: Number of embeddings kept in process
+            backend: "postgres" or "memory"
+        """
+        if backend not in ("postgres", "memory"):
+            raise ValueError(f"Unknown embedding cache backend '{backend}'")
+        self.backend = backend
+        # float32 arrays: a quarter of the memory of float lists, and lossless for
+        # OpenAI embeddings, which are float32 on the wire
+        self._memory: LRUCache = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._inflight: Dict[Tuple[int, str], asyncio.Future] = {}
+        self._table_ready = False
+        self._stats = {
+            "memory_hits": 0,
+            "persistent_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "api_calls": 0,
+            "api_time_ms": 0.0,
+            "persist_errors": 0,
+        }
+
+    def _count(self, key: str, amount: float = 1):
+        with self._lock:
+            self._stats[key] += amount
+
+    async def get(
+        self,
+        model: str,
+        text: str,
+        embed: Callable[[str], Awaitable[List[float]]]
+    ) -> List[float]:
+        """
+        Get the embedding of `text`, calling `embed` only on a miss in both tiers.
+
+        Args:
+            model: Embedding model name, part of the cache key
+            text: Text to embed
+            embed: Coroutine function computing an uncached embedding
+
+        Returns:
+            Embedding vector of the normalized text
+        """
+        normalized = normalize_text(text)
+        key = cache_key(model, normalized)
+
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._stats["memory_hits"] += 1
+                return vector.tolist()
+
+        # Futures belong to one event loop (sync callers may each run their own)
+        loop = asyncio.get_running_loop()
+        inflight_key = (id(loop), key)
+        pending = self._inflight.get(inflight_key)
+        while pending is not None:
+            self._count("coalesced")
+            try:
+                return (await asyncio.shield(pending)).tolist()
+            except asyncio.CancelledError:
+                # Re-raise our own cancellation; if the owner was cancelled, take over the load
+                if not pending.cancelled():
+                    raise
+            pending = self._inflight.get(inflight_key)
+
+        future = loop.create_future()
+        self._inflight[inflight_key] = future
+        try:
+            vector = await self._load(key, model, normalized, embed)
+            future.set_result(vector)
+        except Exception as e:
+            future.set_exception(e)
+            # Retrieve it here so a failure nobody awaited is not logged as never retrieved
+            future.exception()
+            raise
+        finally:
+            # Cancelled (or interrupted): release the waiters so one of them retries
+            if not future.done():
+                future.cancel()
+            self._inflight.pop(inflight_key, None)
+
+        return vector.tolist()
+
+    async def _load(
+        self,
+        key: str,
+        model: str,
+        normalized: str,
+        embed: Callable[[str], Awaitable[List[float]]]
+    ) -> np.ndarray:
+        vector = await self._fetch_persistent(key) if self.backend == "postgres" else None
+        if vector is not None:
+            self._count("persistent_hits")
+        else:
+            self._count("misses")
+            started = time.perf_counter()
+            vector = np.asarray(await embed(normalized), dtype=np.float32)
+            self._count("api_calls")
+            self._count("api_time_ms", (time.perf_counter() - started) * 1000)
+            if self.backend == "postgres":
+                await self._store_persistent(key, model, vector)
+
+        with self._lock:
+            self._memory[key] = vector
+        return vector
+
+    async def _ensure_table(self, conn):
+        if not self._table_ready:
+            await conn.execute(CREATE_TABLE_SQL)
+            self._table_ready = True
+
+    async def _fetch_persistent(self, key: str) -> Optional[np.ndarray]:
+        try:
+            async with db_pool.acquire() as conn:
+                await self._ensure_table(conn)
+                row = await conn.fetchval("SELECT embedding FROM embedding_cache WHERE key = $1", key)
+        except Exception as e:
+            # The persistent tier is an optimization; fall through to the API
+            logger.warning(f"Embedding cache lookup failed: {e}")
+            self._count("persist_errors")
+            return None
+        return np.asarray(row, dtype=np.float32) if row is not None else None
+
+    async def _store_persistent(self, key: str, model: str, vector: np.ndarray):
+        try:
+            async with db_pool.acquire() as conn:
+                await self._ensure_table(conn)
+                await conn.execute(
+                    """
+                    INSERT INTO embedding_cache (key, model, embedding)
+                    VALUES ($1, $2, $3)
+                    ON CONFLICT (key) DO NOTHING
+                    """,
+                    key,
+                    model,
+                    vector.tolist()
+                )
+        except Exception as e:
+            logger.warning(f"Embedding cache store failed: {e}")
+            self._count("persist_errors")
+
+    def clear(self):
+        """Drop the in-process tier (the persistent table is left untouched)."""
+        with self._lock:
+            self._memory.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache metrics.
+
+        Returns:
+            Counters plus size and overall hit rate
+        """
+        with self._lock:
+            stats = dict(self._stats, size=len(self._memory), backend=self.backend)
+        lookups = stats["memory_hits"] + stats["persistent_hits"] + stats["misses"] + stats["coalesced"]
+        stats["hit_rate"] = (lookups - stats["misses"]) / lookups if lookups else 0.0
+        return stats
+
+
+# Global embedding cache instance
+embedding_cache = EmbeddingCache()
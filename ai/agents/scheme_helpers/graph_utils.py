@@ -3,13 +3,20 @@ Graph utilities for Neo4j/Graphiti integration.
 """
 
 import os
+import copy
 import json
+import time
 import logging
-from typing import List, Dict, Any, Optional, Tuple
+import threading
+import unicodedata
+from pathlib import Path
+from collections import defaultdict, deque
+from typing import List, Dict, Any, Optional, Tuple, Callable, Awaitable
 from datetime import datetime, timezone
 from contextlib import asynccontextmanager
 import asyncio
 
+from cachetools import TTLCache
 from graphiti_core import Graphiti
 from graphiti_core.utils.maintenance.graph_data_operations import clear_data
 from graphiti_core.llm_client.config import LLMConfig
@@ -23,6 +30,107 @@ load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Bulk loading: documents loaded at once ("queue" mode) or episodes per add_episode_bulk call ("bulk" mode).
+# Concurrency above 1 is faster but may create duplicate entities (see add_episodes_bulk)
+GRAPH_BULK_CONCURRENCY = int(os.getenv("GRAPH_BULK_CONCURRENCY", "1"))
+GRAPH_BULK_BATCH_SIZE = int(os.getenv("GRAPH_BULK_BATCH_SIZE", "10"))
+
+# Query result cache; entries are also dropped whenever this process writes to the graph
+GRAPH_CACHE_TTL = float(os.getenv("GRAPH_CACHE_TTL", "600"))
+GRAPH_CACHE_SIZE = int(os.getenv("GRAPH_CACHE_SIZE", "1000"))
+
+
+# Cypher traversal bounds; depth decides how many hops are unrolled into the query, so it is validated first
+GRAPH_MAX_DEPTH = int(os.getenv("GRAPH_MAX_DEPTH", "5"))
+GRAPH_QUERY_LIMIT = int(os.getenv("GRAPH_QUERY_LIMIT", "200"))
+GRAPH_FRONTIER_LIMIT = int(os.getenv("GRAPH_FRONTIER_LIMIT", "100"))  # new entities kept per hop
+
+# Extra indexes for the traversal/timeline queries (no-ops when Graphiti already has equivalents)
+GRAPH_INDEXES = [
+    "CREATE INDEX entity_name_lookup IF NOT EXISTS FOR (n:Entity) ON (n.name)",
+    "CREATE INDEX relates_to_valid_at IF NOT EXISTS FOR ()-[r:RELATES_TO]-() ON (r.valid_at)",
+]
+
+# Breadth-first expansion from the start entities, one hop per block. Each hop only
+# expands the previous hop's new entities and keeps at most $frontier_limit of them,
+# so work grows with depth * frontier size rather than with the number of paths
+# (a variable-length pattern enumerates every path, which explodes around hub entities).
+RELATED_ENTITIES_START = """
+MATCH (start:Entity) WHERE start.name IN $names
+WITH collect(DISTINCT start) AS frontier
+WITH frontier, frontier AS seen
+"""
+
+RELATED_ENTITIES_HOP = """
+CALL {
+    WITH frontier, seen
+    UNWIND frontier AS n
+    MATCH (n)-[r:RELATES_TO]-(m:Entity)
+    WHERE ($types IS NULL OR r.name IN $types) AND NOT m IN seen
+    WITH DISTINCT m LIMIT $frontier_limit
+    RETURN collect(m) AS reached
+}
+WITH reached AS frontier, seen + reached AS seen
+"""
+
+# Then every edge among the reached entities in one pass
+RELATED_ENTITIES_EDGES = """
+UNWIND seen AS a
+MATCH (a)-[r:RELATES_TO]->(b:Entity)
+WHERE b IN seen AND ($types IS NULL OR r.name IN $types)
+RETURN DISTINCT a.name AS source, b.name AS target, r.name AS type, r.fact AS fact,
+       r.uuid AS uuid, r.valid_at AS valid_at, r.invalid_at AS invalid_at
+LIMIT $limit
+"""
+
+
+def related_entities_query(depth: int) -> str:
+    """Cypher for entities within `depth` hops, with one bounded expansion block per hop."""
+    return RELATED_ENTITIES_START + RELATED_ENTITIES_HOP * depth + RELATED_ENTITIES_EDGES
+
+ENTITY_TIMELINE_QUERY = """
+MATCH (e:Entity) WHERE e.name IN $names
+MATCH (e)-[r:RELATES_TO]-(other:Entity)
+WHERE ($start_date IS NULL OR r.valid_at >= $start_date)
+  AND ($end_date IS NULL OR r.valid_at <= $end_date)
+RETURN DISTINCT r.uuid AS uuid, r.fact AS fact, r.name AS type, other.name AS related_entity,
+       r.valid_at AS valid_at, r.invalid_at AS invalid_at
+ORDER BY valid_at DESC
+LIMIT $limit
+"""
+
+
+def _name_variants(name: str) -> List[str]:
+    """Spellings of an entity name to look up; an IN list keeps the name index usable."""
+    name = " ".join(name.split())
+    return list(dict.fromkeys([name, name.lower(), name.title(), name.upper(), name.capitalize()]))
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # Graphiti stores zoned datetimes; a naive bound would never compare equal or greater
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def normalize_query(query: str) -> str:
+    """NFKC-normalized, lower-cased query with collapsed whitespace."""
+    return " ".join(unicodedata.normalize("NFKC", query).lower().split())
+
+
+class CountingOpenAIClient(OpenAIClient):
+    """OpenAI LLM client that counts the calls Graphiti makes through it."""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls = 0
+        self._calls_lock = threading.Lock()
+    
+    async def generate_response(self, *args, **kwargs):
+        with self._calls_lock:
+            self.calls += 1
+        return await super().generate_response(*args, **kwargs)
+
 # Help from this PR for setting up the custom clients: https://github.com/getzep/graphiti/pull/601/files
 class GraphitiClient:
     """Manages Graphiti knowledge graph operations."""
@@ -67,7 +175,45 @@ class GraphitiClient:
             raise ValueError("EMBEDDING_API_KEY environment variable not set")
         
         self.graphiti: Optional[Graphiti] = None
+        self.llm_client: Optional[CountingOpenAIClient] = None
         self._initialized = False
+        
+        # Result cache for search/relationship/timeline queries. Keys include the
+        # graph version, so results computed before a write are never served after it
+        self.graph_version = 0
+        self._cache = TTLCache(maxsize=GRAPH_CACHE_SIZE, ttl=GRAPH_CACHE_TTL)
+        self._cache_lock = threading.Lock()
+        self._cache_stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {"hits": 0, "misses": 0})
+    
+    def _build_graphiti(self) -> Graphiti:
+        """Create a Graphiti instance with our LLM, embedder and reranker clients."""
+        llm_config = LLMConfig(
+            api_key=self.llm_api_key,
+            model=self.llm_choice,
+            small_model=self.llm_choice,  # Can be the same as main model
+            base_url=self.llm_base_url
+        )
+        
+        # Counts LLM calls so bulk loads can report calls per episode
+        self.llm_client = CountingOpenAIClient(config=llm_config)
+        
+        embedder = OpenAIEmbedder(
+            config=OpenAIEmbedderConfig(
+                api_key=self.embedding_api_key,
+                embedding_model=self.embedding_model,
+                embedding_dim=self.embedding_dimensions,
+                base_url=self.embedding_base_url
+            )
+        )
+        
+        return Graphiti(
+            self.neo4j_uri,
+            self.neo4j_user,
+            self.neo4j_password,
+            llm_client=self.llm_client,
+            embedder=embedder,
+            cross_encoder=OpenAIRerankerClient(client=self.llm_client, config=llm_config)
+        )
     
     async def initialize(self):
         """Initialize Graphiti client."""
@@ -75,39 +221,12 @@ class GraphitiClient:
             return
         
         try:
-            # Create LLMConfig
-            llm_config = LLMConfig(
-                api_key=self.llm_api_key,
-                model=self.llm_choice,
-                small_model=self.llm_choice,  # Can be the same as main model
-                base_url=self.llm_base_url
-            )
-            
-            # Create OpenAI LLM client
-            llm_client = OpenAIClient(config=llm_config)
-            
-            # Create OpenAI embedder
-            embedder = OpenAIEmbedder(
-                config=OpenAIEmbedderConfig(
-                    api_key=self.embedding_api_key,
-                    embedding_model=self.embedding_model,
-                    embedding_dim=self.embedding_dimensions,
-                    base_url=self.embedding_base_url
-                )
-            )
-            
-            # Initialize Graphiti with custom clients
-            self.graphiti = Graphiti(
-                self.neo4j_uri,
-                self.neo4j_user,
-                self.neo4j_password,
-                llm_client=llm_client,
-                embedder=embedder,
-                cross_encoder=OpenAIRerankerClient(client=llm_client, config=llm_config)
-            )
+            self.graphiti = self._build_graphiti()
             
             # Build indices and constraints
             await self.graphiti.build_indices_and_constraints()
+            for statement in GRAPH_INDEXES:
+                await self.graphiti.driver.execute_query(statement)
             
             self._initialized = True
             logger.info(f"Graphiti client initialized successfully with LLM: {self.llm_choice} and embedder: {self.embedding_model}")
@@ -116,6 +235,60 @@ class GraphitiClient:
             logger.error(f"Failed to initialize Graphiti: {e}")
             raise
     
+    async def _cached(
+        self,
+        method: str,
+        query: str,
+        params: Tuple,
+        compute: Callable[[], Awaitable[Any]],
+        case_sensitive: bool = False
+    ) -> Any:
+        """
+        Return a cached result of `compute`, computing and caching it on a miss.
+        
+        Args:
+            method: Calling method, part of the key and of the metrics
+            query: Query text, normalized for the key
+            params: Other arguments affecting the result (hashable)
+            compute: Coroutine function producing the result; failures are not cached
+            case_sensitive: Keep the query's casing in the key, for lookups whose
+                matches depend on it
+        
+        Returns:
+            A copy of the result, so callers may modify it
+        """
+        query = " ".join(query.split()) if case_sensitive else normalize_query(query)
+        key = (method, query, params, self.graph_version)
+        with self._cache_lock:
+            result = self._cache.get(key)
+            self._cache_stats[method]["hits" if result is not None else "misses"] += 1
+        if result is None:
+            result = await compute()
+            with self._cache_lock:
+                self._cache[key] = result
+        return copy.deepcopy(result)
+    
+    def invalidate_cache(self):
+        """Drop cached query results after the graph changed."""
+        with self._cache_lock:
+            self.graph_version += 1
+            self._cache.clear()
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """
+        Get query cache metrics.
+        
+        Returns:
+            Hits, misses and hit rate per method, plus cache size and graph version
+        """
+        with self._cache_lock:
+            methods = {method: dict(counts) for method, counts in self._cache_stats.items()}
+            size = len(self._cache)
+        for counts in methods.values():
+            lookups = counts["hits"] + counts["misses"]
+            counts["hit_rate"] = counts["hits"] / lookups if lookups else 0.0
+        return {"methods": methods, "size": size, "graph_version": self.graph_version}
+    
     async def close(self):
         """Close Graphiti connection."""
         if self.graphiti:
@@ -157,9 +330,135 @@ class GraphitiClient:
             source_description=source,
             reference_time=episode_timestamp
         )
+        self.invalidate_cache()
         
         logger.info(f"Added episode {episode_id} to knowledge graph")
     
+    async def add_episodes_bulk(
+        self,
+        episodes: List[Dict[str, Any]],
+        concurrency: int = GRAPH_BULK_CONCURRENCY,
+        checkpoint_path: Optional[Path] = None,
+        use_bulk_api: bool = False,
+        batch_size: int = GRAPH_BULK_BATCH_SIZE
+    ) -> Dict[str, Any]:
+        """
+        Add many episodes to the knowledge graph.
+        
+        By default episodes go through add_episode. Episodes of one document
+        (metadata["document_id"]) always run in order, and up to `concurrency`
+        documents run at once. Graphiti resolves entities against what is already
+        in the graph, so episodes running concurrently that mention the same entity
+        can each create their own node; keep `concurrency` at 1 unless duplicate
+        entities are acceptable. `use_bulk_api` uses Graphiti's add_episode_bulk in
+        batches instead, which is faster but skips edge invalidation against
+        existing facts.
+        
+        Args:
+            episodes: Dicts with the add_episode arguments (episode_id, content, source,
+                and optionally timestamp and metadata)
+            concurrency: Documents processed at once
+            checkpoint_path: JSONL file recording finished episodes; episodes already
+                recorded there are skipped, so a crashed load resumes where it stopped
+            use_bulk_api: Use add_episode_bulk instead of concurrent add_episode calls
+            batch_size: Episodes per add_episode_bulk call
+        
+        Returns:
+            Load metrics: counts, errors, episodes per minute and LLM calls per episode
+        """
+        if not self._initialized:
+            await self.initialize()
+        
+        done = set()
+        if checkpoint_path and Path(checkpoint_path).exists():
+            with open(checkpoint_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        done.add(json.loads(line)["episode_id"])
+                    except (ValueError, KeyError):
+                        continue  # a line cut short by the crash
+        pending = [e for e in episodes if e["episode_id"] not in done]
+        
+        checkpoint = open(checkpoint_path, "a", encoding="utf-8") if checkpoint_path else None
+        
+        def record(episode_ids: List[str]):
+            if checkpoint:
+                for episode_id in episode_ids:
+                    checkpoint.write(json.dumps({"episode_id": episode_id}) + "\n")
+                checkpoint.flush()
+        
+        errors: List[str] = []
+        added = 0
+        calls_before = self.llm_client.calls
+        started = time.perf_counter()
+        
+        try:
+            if use_bulk_api:
+                from graphiti_core.nodes import EpisodeType
+                from graphiti_core.utils.bulk_utils import RawEpisode
+                
+                for i in range(0, len(pending), batch_size):
+                    batch = pending[i:i + batch_size]
+                    try:
+                        await self.graphiti.add_episode_bulk([
+                            RawEpisode(
+                                name=e["episode_id"],
+                                content=e["content"],
+                                source=EpisodeType.text,
+                                source_description=e["source"],
+                                reference_time=e.get("timestamp") or datetime.now(timezone.utc)
+                            )
+                            for e in batch
+                        ])
+                    except Exception as e:
+                        errors.append(f"Batch starting at {batch[0]['episode_id']} failed: {e}")
+                        continue
+                    finally:
+                        self.invalidate_cache()  # a failed batch may have written part of its episodes
+                    added += len(batch)
+                    record([e["episode_id"] for e in batch])
+            else:
+                documents: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+                for episode in pending:
+                    documents[(episode.get("metadata") or {}).get("document_id", episode["episode_id"])].append(episode)
+                semaphore = asyncio.Semaphore(concurrency)
+                
+                async def load(document_episodes: List[Dict[str, Any]]):
+                    nonlocal added
+                    async with semaphore:
+                        for episode in document_episodes:
+                            try:
+                                await self.add_episode(**episode)
+                            except Exception as e:
+                                errors.append(f"Episode {episode['episode_id']} failed: {e}")
+                                continue
+                            added += 1
+                            record([episode["episode_id"]])
+                
+                await asyncio.gather(*(load(group) for group in documents.values()))
+        finally:
+            if checkpoint:
+                checkpoint.close()
+        
+        elapsed = time.perf_counter() - started
+        llm_calls = self.llm_client.calls - calls_before
+        stats = {
+            "episodes": len(episodes),
+            "added": added,
+            "skipped": len(episodes) - len(pending),
+            "failed": len(pending) - added,
+            "errors": errors,
+            "elapsed_s": elapsed,
+            "episodes_per_minute": added / elapsed * 60 if elapsed else 0.0,
+            "llm_calls": llm_calls,
+            "llm_calls_per_episode": llm_calls / added if added else 0.0
+        }
+        logger.info(
+            f"Bulk loaded {added}/{len(pending)} episodes ({stats['skipped']} already done) in {elapsed:.1f}s: "
+            f"{stats['episodes_per_minute']:.1f} episodes/min, {stats['llm_calls_per_episode']:.1f} LLM calls/episode"
+        )
+        return stats
+    
     async def search(
         self,
         query: str,
@@ -180,7 +479,7 @@ class GraphitiClient:
         if not self._initialized:
             await self.initialize()
         
-        try:
+        async def run_search() -> List[Dict[str, Any]]:
             # Use Graphiti's search method (simplified parameters)
             results = await self.graphiti.search(query)
             
@@ -195,7 +494,9 @@ class GraphitiClient:
                 }
                 for result in results
             ]
-            
+        
+        try:
+            return await self._cached("search", query, (center_node_distance, use_hybrid_search), run_search)
         except Exception as e:
             logger.error(f"Graph search failed: {e}")
             return []
@@ -207,42 +508,79 @@ class GraphitiClient:
         depth: int = 1
     ) -> Dict[str, Any]:
         """
-        Get entities related to a given entity using Graphiti search.
+        Get entities within `depth` hops of an entity with a single Cypher query.
         
         Args:
             entity_name: Name of the entity
-            relationship_types: Types of relationships to follow (not used with Graphiti)
-            depth: Maximum depth to traverse (not used with Graphiti)
+            relationship_types: Relationship names to follow (e.g. "ELIGIBLE_FOR"); all when None
+            depth: Maximum depth to traverse (1 to GRAPH_MAX_DEPTH)
         
         Returns:
-            Related entities and relationships
+            Related entities with their distance, and the relationships between them
         """
+        if not isinstance(depth, int) or not 1 <= depth <= GRAPH_MAX_DEPTH:
+            raise ValueError(f"depth must be between 1 and {GRAPH_MAX_DEPTH}, got {depth}")
+        
         if not self._initialized:
             await self.initialize()
         
-        # Use Graphiti search to find related information about the entity
-        results = await self.graphiti.search(f"relationships involving {entity_name}")
-        
-        # Extract entity information from the search results
-        related_entities = set()
-        facts = []
+        types = [t.strip().upper() for t in relationship_types if t.strip()] if relationship_types else None
         
-        for result in results:
-            facts.append({
-                "fact": result.fact,
-                "uuid": str(result.uuid),
-                "valid_at": str(result.valid_at) if hasattr(result, 'valid_at') and result.valid_at else None
-            })
+        async def run_query() -> Dict[str, Any]:
+            records, _, _ = await self.graphiti.driver.execute_query(
+                related_entities_query(depth),
+                names=_name_variants(entity_name),
+                types=types or None,
+                frontier_limit=GRAPH_FRONTIER_LIMIT,
+                limit=GRAPH_QUERY_LIMIT
+            )
             
-            # Simple entity extraction from fact text (could be enhanced)
-            if entity_name.lower() in result.fact.lower():
-                related_entities.add(entity_name)
-        
-        return {
-            "central_entity": entity_name,
-            "related_facts": facts,
-            "search_method": "graphiti_semantic_search"
-        }
+            relationships = [
+                {
+                    "source": record["source"],
+                    "target": record["target"],
+                    "type": record["type"],
+                    "fact": record["fact"],
+                    "uuid": str(record["uuid"]),
+                    "valid_at": str(record["valid_at"]) if record["valid_at"] else None,
+                    "invalid_at": str(record["invalid_at"]) if record["invalid_at"] else None
+                }
+                for record in records
+            ]
+            
+            # Hop counts by BFS over the returned edges
+            neighbours: Dict[str, set] = defaultdict(set)
+            for rel in relationships:
+                neighbours[rel["source"]].add(rel["target"])
+                neighbours[rel["target"]].add(rel["source"])
+            starts = [name for name in _name_variants(entity_name) if name in neighbours]
+            distance = {name: 0 for name in starts}
+            queue = deque(starts)
+            while queue:
+                node = queue.popleft()
+                if distance[node] == depth:
+                    continue
+                for other in neighbours[node]:
+                    if other not in distance:
+                        distance[other] = distance[node] + 1
+                        queue.append(other)
+            
+            return {
+                "central_entity": entity_name,
+                "related_entities": [
+                    {"name": name, "distance": hops}
+                    for name, hops in sorted(distance.items(), key=lambda item: (item[1], item[0]))
+                    if hops > 0
+                ],
+                "relationships": relationships,
+                "depth": depth,
+                "relationship_types": types,
+                "search_method": "cypher_traversal"
+            }
+        
+        params = (tuple(sorted(types or ())), depth)
+        # _name_variants matches the given casing too, so "PM kisan" and "PM Kisan" differ
+        return await self._cached("get_related_entities", entity_name, params, run_query, case_sensitive=True)
     
     async def get_entity_timeline(
         self,
@@ -251,35 +589,44 @@ class GraphitiClient:
         end_date: Optional[datetime] = None
     ) -> List[Dict[str, Any]]:
         """
-        Get timeline of facts for an entity using Graphiti.
+        Get timeline of facts about an entity, filtered on valid_at in Neo4j.
         
         Args:
             entity_name: Name of the entity
-            start_date: Start of time range (not currently used)
-            end_date: End of time range (not currently used)
+            start_date: Earliest valid_at to include (naive datetimes are taken as UTC)
+            end_date: Latest valid_at to include
         
         Returns:
-            Timeline of facts
+            Facts about the entity, newest first
         """
         if not self._initialized:
             await self.initialize()
         
-        # Search for temporal information about the entity
-        results = await self.graphiti.search(f"timeline history of {entity_name}")
-        
-        timeline = []
-        for result in results:
-            timeline.append({
-                "fact": result.fact,
-                "uuid": str(result.uuid),
-                "valid_at": str(result.valid_at) if hasattr(result, 'valid_at') and result.valid_at else None,
-                "invalid_at": str(result.invalid_at) if hasattr(result, 'invalid_at') and result.invalid_at else None
-            })
+        start_date, end_date = _as_utc(start_date), _as_utc(end_date)
         
-        # Sort by valid_at if available
-        timeline.sort(key=lambda x: x.get('valid_at') or '', reverse=True)
+        async def run_query() -> List[Dict[str, Any]]:
+            records, _, _ = await self.graphiti.driver.execute_query(
+                ENTITY_TIMELINE_QUERY,
+                names=_name_variants(entity_name),
+                start_date=start_date,
+                end_date=end_date,
+                limit=GRAPH_QUERY_LIMIT
+            )
+            
+            return [
+                {
+                    "fact": record["fact"],
+                    "uuid": str(record["uuid"]),
+                    "type": record["type"],
+                    "related_entity": record["related_entity"],
+                    "valid_at": str(record["valid_at"]) if record["valid_at"] else None,
+                    "invalid_at": str(record["invalid_at"]) if record["invalid_at"] else None
+                }
+                for record in records
+            ]
         
-        return timeline
+        params = (start_date.isoformat() if start_date else None, end_date.isoformat() if end_date else None)
+        return await self._cached("get_entity_timeline", entity_name, params, run_query, case_sensitive=True)
     
     async def get_graph_statistics(self) -> Dict[str, Any]:
         """
@@ -314,6 +661,7 @@ class GraphitiClient:
         try:
             # Use Graphiti's proper clear_data function with the driver
             await clear_data(self.graphiti.driver)
+            self.invalidate_cache()
             logger.warning("Cleared all data from knowledge graph")
         except Exception as e:
             logger.error(f"Failed to clear graph using clear_data: {e}")
@@ -321,34 +669,9 @@ class GraphitiClient:
             if self.graphiti:
                 await self.graphiti.close()
             
-            # Create OpenAI-compatible clients for reinitialization
-            llm_config = LLMConfig(
-                api_key=self.llm_api_key,
-                model=self.llm_choice,
-                small_model=self.llm_choice,
-                base_url=self.llm_base_url
-            )
-            
-            llm_client = OpenAIClient(config=llm_config)
-            
-            embedder = OpenAIEmbedder(
-                config=OpenAIEmbedderConfig(
-                    api_key=self.embedding_api_key,
-                    embedding_model=self.embedding_model,
-                    embedding_dim=self.embedding_dimensions,
-                    base_url=self.embedding_base_url
-                )
-            )
-            
-            self.graphiti = Graphiti(
-                self.neo4j_uri,
-                self.neo4j_user,
-                self.neo4j_password,
-                llm_client=llm_client,
-                embedder=embedder,
-                cross_encoder=OpenAIRerankerClient(client=llm_client, config=llm_config)
-            )
+            self.graphiti = self._build_graphiti()
             await self.graphiti.build_indices_and_constraints()
+            self.invalidate_cache()
             
             logger.warning("Reinitialized Graphiti client (fresh indices created)")
 
@@ -399,6 +722,29 @@ async def add_to_knowledge_graph(
     return episode_id
 
 
+async def add_many_to_knowledge_graph(
+    episodes: List[Dict[str, Any]],
+    checkpoint_path: Optional[Path] = None,
+    concurrency: int = GRAPH_BULK_CONCURRENCY
+) -> Dict[str, Any]:
+    """
+    Add many episodes to the knowledge graph concurrently.
+    
+    Args:
+        episodes: Dicts with episode_id, content, source and optional timestamp/metadata
+        checkpoint_path: Optional JSONL checkpoint to resume an interrupted load
+        concurrency: Documents processed at once
+    
+    Returns:
+        Load metrics
+    """
+    return await graph_client.add_episodes_bulk(
+        episodes,
+        concurrency=concurrency,
+        checkpoint_path=checkpoint_path
+    )
+
+
 async def search_knowledge_graph(
     query: str
 ) -> List[Dict[str, Any]]:
@@ -416,7 +762,8 @@ async def search_knowledge_graph(
 
 async def get_entity_relationships(
     entity: str,
-    depth: int = 2
+    depth: int = 2,
+    relationship_types: Optional[List[str]] = None
 ) -> Dict[str, Any]:
     """
     Get relationships for an entity.
@@ -424,11 +771,16 @@ async def get_entity_relationships(
     Args:
         entity: Entity name
         depth: Maximum traversal depth
+        relationship_types: Relationship names to follow; all when None
     
     Returns:
         Entity relationships
     """
-    return await graph_client.get_related_entities(entity, depth=depth)
+    return await graph_client.get_related_entities(
+        entity,
+        relationship_types=relationship_types,
+        depth=depth
+    )
 
 
 async def test_graph_connection() -> bool:
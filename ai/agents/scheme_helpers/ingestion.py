@@ -0,0 +1,616 @@
+"""
+Document ingestion pipeline for scheme documents.
+
+Reads scheme pages (markdown/text, or PDF when pypdf is installed), chunks them
+per IngestionConfig, embeds chunks in size-bounded batches with bounded
+concurrency and retry/backoff, and bulk-loads them with COPY.
+
+Re-ingestion is incremental: documents are matched by source, unchanged
+documents are skipped, and within a changed document only chunks whose content
+hash is new are embedded, inserted and sent to the knowledge graph.
+
+Knowledge graph episodes are queued while documents are stored and loaded
+concurrently at the end; with --graph-checkpoint an interrupted graph load
+resumes where it stopped. Run from ai/:
+
+    python -m agents.scheme_helpers.ingestion --documents documents/ --skip-graph
+"""
+
+import os
+import re
+import time
+import hashlib
+import random
+import asyncio
+import logging
+import argparse
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import openai
+from dotenv import load_dotenv
+
+from .db_utils import db_pool, initialize_database, close_database
+from .models import IngestionConfig, IngestionResult
+from .providers import get_embedding_client, get_embedding_model
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Size bounds per embeddings request (OpenAI allows 2048 inputs / 300k tokens)
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "128"))
+EMBEDDING_BATCH_TOKENS = int(os.getenv("EMBEDDING_BATCH_TOKENS", "100000"))
+EMBEDDING_CONCURRENCY = int(os.getenv("EMBEDDING_CONCURRENCY", "4"))
+EMBEDDING_MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", "5"))
+
+DOCUMENT_PATTERNS = ("*.md", "*.txt", "*.pdf")
+
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError,
+)
+
+_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count tokens with the tokenizer of the OpenAI embedding models.
+
+    Args:
+        text: Text to count
+
+    Returns:
+        Number of cl100k_base tokens
+    """
+    global _encoding
+    if _encoding is None:
+        import tiktoken
+        _encoding = tiktoken.get_encoding("cl100k_base")
+    return len(_encoding.encode(text, disallowed_special=()))
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 of text, used to detect unchanged documents and chunks."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def read_document(path: Path) -> Tuple[str, str]:
+    """
+    Read a document from disk.
+
+    Args:
+        path: Markdown, text or PDF file
+
+    Returns:
+        Title and text content
+    """
+    if path.suffix.lower() == ".pdf":
+        try:
+            from pypdf import PdfReader
+        except ImportError as e:
+            raise RuntimeError("PDF ingestion requires pypdf (pip install pypdf)") from e
+        content = "\n\n".join(page.extract_text() or "" for page in PdfReader(str(path)).pages)
+    else:
+        content = path.read_text(encoding="utf-8")
+
+    # First markdown heading, else the file name
+    heading = re.search(r"^#\s+(.+)$", content, re.MULTILINE)
+    title = heading.group(1).strip() if heading else path.stem.replace("_", " ").replace("-", " ").title()
+    return title, content
+
+
+# Chunking
+def _split_sections(text: str) -> List[str]:
+    """Split at markdown headings, so an edit only re-chunks its own section."""
+    return [section for section in re.split(r"\n(?=#{1,6}\s)", text) if section.strip()]
+
+
+def _split_units(text: str, chunk_size: int) -> List[str]:
+    """Paragraphs, with over-long paragraphs split into sentences and over-long sentences into windows."""
+    units = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) <= chunk_size:
+            units.append(paragraph)
+            continue
+        for sentence in re.split(r"(?<=[.!?।])\s+", paragraph):
+            while len(sentence) > chunk_size:
+                units.append(sentence[:chunk_size])
+                sentence = sentence[chunk_size:]
+            if sentence:
+                units.append(sentence)
+    return units
+
+
+def chunk_text(text: str, config: IngestionConfig) -> List[str]:
+    """
+    Split text into chunks per the ingestion config.
+
+    With use_semantic_chunking, paragraphs/sentences of each markdown section are
+    packed up to chunk_size and neighbouring chunks share up to chunk_overlap
+    characters of whole units; chunks never span sections, which keeps chunk
+    boundaries (and content hashes) stable when other sections change.
+    Otherwise fixed chunk_size windows overlap by chunk_overlap characters.
+    No chunk exceeds max_chunk_size.
+
+    Args:
+        text: Document text
+        config: Ingestion configuration
+
+    Returns:
+        Chunk texts in document order
+    """
+    text = text.strip()
+    if not text:
+        return []
+
+    if not config.use_semantic_chunking:
+        step = config.chunk_size - config.chunk_overlap
+        return [text[i:i + config.chunk_size] for i in range(0, max(len(text) - config.chunk_overlap, 1), step)]
+
+    chunk_size = min(config.chunk_size, config.max_chunk_size)
+    chunks: List[str] = []
+    for section in _split_sections(text):
+        chunks.extend(_pack_units(_split_units(section, chunk_size), chunk_size, config))
+    return chunks
+
+
+def _pack_units(units: List[str], chunk_size: int, config: IngestionConfig) -> List[str]:
+    chunks: List[str] = []
+    current: List[str] = []
+    length = 0
+    for unit in units:
+        if current and length + len(unit) + 1 > chunk_size:
+            chunks.append("\n".join(current))
+            # Carry trailing units into the next chunk as overlap
+            overlap: List[str] = []
+            overlap_len = 0
+            for prev in reversed(current):
+                if overlap_len + len(prev) + 1 > config.chunk_overlap:
+                    break
+                overlap.insert(0, prev)
+                overlap_len += len(prev) + 1
+            if overlap_len + len(unit) > config.max_chunk_size:
+                overlap, overlap_len = [], 0
+            current, length = overlap, overlap_len
+        current.append(unit)
+        length += len(unit) + 1
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def make_batches(token_counts: List[int], max_items: int, max_tokens: int) -> List[List[int]]:
+    """
+    Group chunk indices into embedding requests bounded by input count and tokens.
+
+    Args:
+        token_counts: Token count per chunk
+        max_items: Maximum inputs per request
+        max_tokens: Maximum total tokens per request
+
+    Returns:
+        Lists of chunk indices, in order
+    """
+    batches: List[List[int]] = []
+    batch: List[int] = []
+    tokens = 0
+    for i, n in enumerate(token_counts):
+        if batch and (len(batch) >= max_items or tokens + n > max_tokens):
+            batches.append(batch)
+            batch, tokens = [], 0
+        batch.append(i)
+        tokens += n
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class DocumentIngestionPipeline:
+    """Chunks, embeds and stores scheme documents."""
+
+    def __init__(
+        self,
+        config: Optional[IngestionConfig] = None,
+        clean_before_ingest: bool = False,
+        batch_size: int = EMBEDDING_BATCH_SIZE,
+        batch_tokens: int = EMBEDDING_BATCH_TOKENS,
+        concurrency: int = EMBEDDING_CONCURRENCY,
+        max_retries: int = EMBEDDING_MAX_RETRIES,
+        incremental: bool = True,
+        graph_concurrency: Optional[int] = None,
+        graph_checkpoint: Optional[Path] = None
+    ):
+        """
+        Initialize the pipeline.
+
+        Args:
+            config: Chunking/graph configuration
+            clean_before_ingest: Delete all documents and chunks first
+            batch_size: Maximum chunks per embeddings request
+            batch_tokens: Maximum tokens per embeddings request
+            concurrency: Maximum embeddings requests in flight
+            max_retries: Retries per batch on rate limits and transient errors
+            incremental: Reuse unchanged chunks of previously ingested documents;
+                when False every chunk is re-embedded and replaced
+            graph_concurrency: Documents loaded into the graph at once (GRAPH_BULK_CONCURRENCY,
+                1 by default; higher is faster but may duplicate entities)
+            graph_checkpoint: JSONL checkpoint of loaded graph episodes; when set, every
+                chunk is queued and the checkpoint filters out those already loaded
+        """
+        self.config = config or IngestionConfig()
+        self.clean_before_ingest = clean_before_ingest
+        self.batch_size = batch_size
+        self.batch_tokens = batch_tokens
+        self.max_retries = max_retries
+        self.incremental = incremental
+        self.graph_concurrency = graph_concurrency
+        self.graph_checkpoint = graph_checkpoint
+        self.pending_episodes: List[Dict[str, Any]] = []
+        self.graph_stats: Optional[Dict[str, Any]] = None
+        self.embedding_client = get_embedding_client()
+        self.embedding_model = get_embedding_model()
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.embedding_requests = 0
+        self.embedding_retries = 0
+
+    async def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        async with self._semaphore:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    self.embedding_requests += 1
+                    response = await self.embedding_client.embeddings.create(
+                        model=self.embedding_model,
+                        input=texts
+                    )
+                    return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+                except RETRYABLE_ERRORS as e:
+                    if attempt == self.max_retries:
+                        raise
+                    self.embedding_retries += 1
+                    # Exponential backoff with full jitter
+                    delay = random.uniform(0, min(60.0, 2 ** attempt))
+                    logger.warning(f"Embedding batch of {len(texts)} failed ({e}); retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+
+    async def embed_chunks(self, chunks: List[str], token_counts: List[int]) -> List[List[float]]:
+        """
+        Embed chunks in size-bounded batches with bounded concurrency.
+
+        Args:
+            chunks: Chunk texts
+            token_counts: Token count per chunk
+
+        Returns:
+            One embedding per chunk, in input order
+        """
+        batches = make_batches(token_counts, self.batch_size, self.batch_tokens)
+        results = await asyncio.gather(*(self._embed_batch([chunks[i] for i in batch]) for batch in batches))
+        embeddings: List[Optional[List[float]]] = [None] * len(chunks)
+        for batch, vectors in zip(batches, results):
+            for i, vector in zip(batch, vectors):
+                embeddings[i] = vector
+        return embeddings
+
+    async def _existing_document(self, source: str) -> Optional[Dict[str, Any]]:
+        async with db_pool.acquire() as conn:
+            row = await conn.fetchrow(
+                """
+                SELECT d.id::text AS id, d.metadata->>'content_hash' AS content_hash, COUNT(c.id) AS chunk_count
+                FROM documents d
+                LEFT JOIN chunks c ON c.document_id = d.id
+                WHERE d.source = $1
+                GROUP BY d.id
+                ORDER BY d.updated_at DESC
+                LIMIT 1
+                """,
+                source
+            )
+        return dict(row) if row else None
+
+    async def _existing_chunks(self, document_id: str) -> Dict[Optional[str], List[str]]:
+        async with db_pool.acquire() as conn:
+            rows = await conn.fetch(
+                "SELECT id::text AS id, metadata->>'content_hash' AS content_hash FROM chunks WHERE document_id = $1::uuid",
+                document_id
+            )
+        by_hash: Dict[Optional[str], List[str]] = defaultdict(list)
+        for row in rows:
+            by_hash[row["content_hash"]].append(row["id"])
+        return by_hash
+
+    async def _store(
+        self,
+        document_id: Optional[str],
+        title: str,
+        source: str,
+        content: str,
+        metadata: Dict[str, Any],
+        chunks: List[str],
+        hashes: List[str],
+        kept: List[Tuple[str, int]],
+        new: List[int],
+        embeddings: List[List[float]],
+        token_counts: List[int],
+        deleted: List[str]
+    ) -> str:
+        def chunk_metadata(i: int) -> Dict[str, Any]:
+            return {"chunk_index": i, "total_chunks": len(chunks), "content_hash": hashes[i]}
+
+        async with db_pool.acquire() as conn:
+            async with conn.transaction():
+                if document_id is None:
+                    document_id = await conn.fetchval(
+                        """
+                        INSERT INTO documents (title, source, content, metadata)
+                        VALUES ($1, $2, $3, $4)
+                        RETURNING id::text
+                        """,
+                        title,
+                        source,
+                        content,
+                        metadata
+                    )
+                else:
+                    await conn.execute(
+                        """
+                        UPDATE documents
+                        SET title = $2, content = $3, metadata = $4, updated_at = CURRENT_TIMESTAMP
+                        WHERE id = $1::uuid
+                        """,
+                        document_id,
+                        title,
+                        content,
+                        metadata
+                    )
+                if deleted:
+                    await conn.execute("DELETE FROM chunks WHERE id = ANY($1::uuid[])", deleted)
+                if kept:
+                    # Unchanged chunks keep their embedding; only their position is refreshed
+                    await conn.executemany(
+                        "UPDATE chunks SET chunk_index = $2, metadata = $3 WHERE id = $1::uuid",
+                        [(chunk_id, i, chunk_metadata(i)) for chunk_id, i in kept]
+                    )
+                # Binary COPY relies on the vector/jsonb codecs registered by db_utils
+                await conn.copy_records_to_table(
+                    "chunks",
+                    columns=["document_id", "content", "embedding", "chunk_index", "metadata", "token_count"],
+                    records=[
+                        (document_id, chunks[i], embedding, i, chunk_metadata(i), tokens)
+                        for i, embedding, tokens in zip(new, embeddings, token_counts)
+                    ]
+                )
+        return document_id
+
+    async def _stored_chunks(self, document_id: str) -> Tuple[List[str], List[str]]:
+        async with db_pool.acquire() as conn:
+            rows = await conn.fetch(
+                "SELECT content, metadata->>'content_hash' AS content_hash FROM chunks "
+                "WHERE document_id = $1::uuid ORDER BY chunk_index",
+                document_id
+            )
+        return [row["content"] for row in rows], [row["content_hash"] for row in rows]
+
+    def _queue_episodes(
+        self,
+        document_id: str,
+        title: str,
+        source: str,
+        chunks: List[str],
+        hashes: List[str],
+        indices: List[int]
+    ):
+        for i in indices:
+            self.pending_episodes.append({
+                # Named by content hash, so re-running never duplicates an episode
+                "episode_id": f"{document_id}_{hashes[i][:16]}",
+                "content": chunks[i],
+                "source": f"{title} ({source})",
+                "timestamp": datetime.now(timezone.utc),
+                "metadata": {"document_id": document_id, "chunk_index": i}
+            })
+
+    async def build_graph(self) -> Dict[str, Any]:
+        """
+        Load the queued episodes into the knowledge graph.
+
+        Returns:
+            Bulk load metrics from GraphitiClient.add_episodes_bulk
+        """
+        from .graph_utils import graph_client, GRAPH_BULK_CONCURRENCY  # needs Neo4j settings, so only imported when used
+
+        episodes, self.pending_episodes = self.pending_episodes, []
+        self.graph_stats = await graph_client.add_episodes_bulk(
+            episodes,
+            concurrency=self.graph_concurrency or GRAPH_BULK_CONCURRENCY,
+            checkpoint_path=self.graph_checkpoint
+        )
+        for error in self.graph_stats["errors"]:
+            logger.error(error)
+        return self.graph_stats
+
+    async def ingest_document(self, path: Path, metadata: Optional[Dict[str, Any]] = None) -> IngestionResult:
+        """
+        Ingest one document, incrementally when it was ingested before.
+
+        Args:
+            path: Document file
+            metadata: Extra document metadata
+
+        Returns:
+            Ingestion result with per-stage timings and chunk counts
+        """
+        timings: Dict[str, float] = {}
+        started = stage = time.perf_counter()
+
+        def lap(name: str):
+            nonlocal stage
+            now = time.perf_counter()
+            timings[name] = (now - stage) * 1000
+            stage = now
+
+        title, content = read_document(path)
+        source = str(path)
+        document_hash = content_hash(content)
+        existing = await self._existing_document(source)
+        lap("read")
+
+        build_graph = not self.config.skip_graph_building
+        if existing and self.incremental and existing["content_hash"] == document_hash:
+            logger.info(f"Skipped '{title}': unchanged")
+            if build_graph and self.graph_checkpoint:
+                # Its graph load may have been interrupted; the checkpoint skips what finished
+                chunks, hashes = await self._stored_chunks(existing["id"])
+                self._queue_episodes(existing["id"], title, source, chunks, hashes, list(range(len(chunks))))
+            return IngestionResult(
+                document_id=existing["id"],
+                title=title,
+                chunks_created=0,
+                chunks_unchanged=existing["chunk_count"],
+                entities_extracted=0,
+                relationships_created=0,
+                processing_time_ms=(time.perf_counter() - started) * 1000,
+                stage_timings_ms=timings
+            )
+
+        chunks = chunk_text(content, self.config)
+        hashes = [content_hash(c) for c in chunks]
+        previous = await self._existing_chunks(existing["id"]) if existing else {}
+        if not self.incremental:
+            previous = {None: [chunk_id for ids in previous.values() for chunk_id in ids]}
+        kept: List[Tuple[str, int]] = []
+        new: List[int] = []
+        for i, h in enumerate(hashes):
+            if previous.get(h):
+                kept.append((previous[h].pop(), i))
+            else:
+                new.append(i)
+        deleted = [chunk_id for ids in previous.values() for chunk_id in ids]
+        token_counts = [count_tokens(chunks[i]) for i in new]
+        lap("chunk")
+
+        embeddings = await self.embed_chunks([chunks[i] for i in new], token_counts)
+        lap("embed")
+
+        document_id = await self._store(
+            existing["id"] if existing else None,
+            title, source, content,
+            {"file_name": path.name, "content_hash": document_hash,
+             "ingested_at": datetime.now(timezone.utc).isoformat(), **(metadata or {})},
+            chunks, hashes, kept, new, embeddings, token_counts, deleted
+        )
+        lap("store")
+
+        if build_graph:
+            indices = list(range(len(chunks))) if self.graph_checkpoint else new
+            self._queue_episodes(document_id, title, source, chunks, hashes, indices)
+
+        result = IngestionResult(
+            document_id=document_id,
+            title=title,
+            chunks_created=len(new),
+            chunks_unchanged=len(kept),
+            chunks_deleted=len(deleted),
+            entities_extracted=0,
+            relationships_created=0,
+            processing_time_ms=(time.perf_counter() - started) * 1000,
+            stage_timings_ms=timings
+        )
+        logger.info(
+            f"Ingested '{title}': {len(new)} new, {len(kept)} unchanged, {len(deleted)} deleted chunks "
+            f"in {result.processing_time_ms:.0f}ms {timings}"
+        )
+        return result
+
+    async def ingest_directory(self, documents_dir: str) -> List[IngestionResult]:
+        """
+        Ingest every supported document under a directory.
+
+        Args:
+            documents_dir: Directory searched recursively for .md/.txt/.pdf files
+
+        Returns:
+            One result per document; failed documents are logged and skipped
+        """
+        await initialize_database()
+        if self.clean_before_ingest:
+            async with db_pool.acquire() as conn:
+                await conn.execute("DELETE FROM chunks")
+                await conn.execute("DELETE FROM documents")
+            logger.warning("Cleaned existing documents and chunks")
+
+        paths = sorted({p for pattern in DOCUMENT_PATTERNS for p in Path(documents_dir).rglob(pattern)})
+        results = []
+        for path in paths:
+            try:
+                results.append(await self.ingest_document(path))
+            except Exception as e:
+                logger.error(f"Failed to ingest {path}: {e}")
+
+        # Entity extraction dominates ingestion time, so it runs last, concurrently across documents
+        if self.pending_episodes:
+            await self.build_graph()
+        return results
+
+
+async def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Ingest scheme documents into the vector database")
+    parser.add_argument("--documents", "-d", default="documents", help="Documents directory")
+    parser.add_argument("--clean", "-c", action="store_true", help="Delete existing documents first")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    parser.add_argument("--no-semantic", action="store_true", help="Fixed-size windows instead of paragraph packing")
+    parser.add_argument("--skip-graph", action="store_true", help="Skip knowledge graph building")
+    parser.add_argument("--full", action="store_true", help="Re-embed every chunk instead of only changed ones")
+    parser.add_argument("--graph-concurrency", type=int, default=None, help="Documents loaded into the graph at once (may duplicate entities above 1)")
+    parser.add_argument("--graph-checkpoint", type=Path, default=None, help="JSONL checkpoint to resume graph loading")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    config = IngestionConfig(
+        chunk_size=args.chunk_size,
+        chunk_overlap=args.chunk_overlap,
+        use_semantic_chunking=not args.no_semantic,
+        skip_graph_building=args.skip_graph
+    )
+    pipeline = DocumentIngestionPipeline(
+        config,
+        clean_before_ingest=args.clean,
+        incremental=not args.full,
+        graph_concurrency=args.graph_concurrency,
+        graph_checkpoint=args.graph_checkpoint
+    )
+    started = time.perf_counter()
+    try:
+        results = await pipeline.ingest_directory(args.documents)
+    finally:
+        await close_database()
+        if pipeline.graph_stats is not None:
+            from .graph_utils import close_graph
+            await close_graph()
+
+    created = sum(r.chunks_created for r in results)
+    unchanged = sum(r.chunks_unchanged for r in results)
+    deleted = sum(r.chunks_deleted for r in results)
+    print(f"Ingested {len(results)} documents in {time.perf_counter() - started:.1f}s: "
+          f"{created} new, {unchanged} unchanged, {deleted} deleted chunks "
+          f"({pipeline.embedding_requests} embedding requests, {pipeline.embedding_retries} retries)")
+    if pipeline.graph_stats:
+        graph = pipeline.graph_stats
+        print(f"Knowledge graph: {graph['added']} episodes added, {graph['skipped']} already loaded, "
+              f"{graph['failed']} failed; {graph['episodes_per_minute']:.1f} episodes/min, "
+              f"{graph['llm_calls_per_episode']:.1f} LLM calls/episode")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
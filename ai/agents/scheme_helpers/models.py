@@ -117,9 +117,9 @@ class ChatResponse(BaseModel):
 
 
 class StreamDelta(BaseModel):
-    """Streaming response delta."""
-    content: str
-    delta_type: Literal["text", "tool_call", "end"] = "text"
+    """Streaming response delta (also the SSE wire format of /api/query/stream)."""
+    content: str = ""
+    delta_type: Literal["intent", "data", "text", "tool_call", "error", "end"] = "text"
     metadata: Dict[str, Any] = Field(default_factory=dict)
 
 
@@ -226,9 +226,12 @@ class IngestionResult(BaseModel):
     document_id: str
     title: str
     chunks_created: int
+    chunks_unchanged: int = Field(default=0, description="Chunks reused from a previous ingestion")
+    chunks_deleted: int = Field(default=0, description="Chunks removed because their content changed")
     entities_extracted: int
     relationships_created: int
     processing_time_ms: float
+    stage_timings_ms: Dict[str, float] = Field(default_factory=dict, description="Milliseconds per pipeline stage")
     errors: List[str] = Field(default_factory=list)
 
 
@@ -5,7 +5,7 @@ Tools for the Pydantic AI agent.
 import os
 import logging
 from typing import List, Dict, Any, Optional
-from datetime import datetime
+from datetime import datetime, timedelta
 import asyncio
 
 from pydantic import BaseModel, Field
@@ -25,6 +25,7 @@ from .graph_utils import (
 )
 from .models import ChunkResult, GraphSearchResult, DocumentMetadata
 from .providers import get_embedding_client, get_embedding_model
+from .embedding_cache import embedding_cache
 
 # Load environment variables
 load_dotenv()
@@ -37,6 +38,19 @@ EMBEDDING_MODEL = get_embedding_model()
 
 
 async def generate_embedding(text: str) -> List[float]:
+    """
+    Generate embedding for text, served from the embedding cache when possible.
+    
+    Args:
+        text: Text to embed
+    
+    Returns:
+        Embedding vector
+    """
+    return await embedding_cache.get(EMBEDDING_MODEL, text, _embed_uncached)
+
+
+async def _embed_uncached(text: str) -> List[float]:
     """
     Generate embedding for text using OpenAI.
     
@@ -91,6 +105,9 @@ class EntityRelationshipInput(BaseModel):
     """Input for entity relationship query."""
     entity_name: str = Field(..., description="Name of the entity")
     depth: int = Field(default=2, description="Maximum traversal depth")
+    relationship_types: Optional[List[str]] = Field(
+        None, description="Relationship types to follow (e.g. ELIGIBLE_FOR); all when omitted"
+    )
 
 
 class EntityTimelineInput(BaseModel):
@@ -286,7 +303,8 @@ async def get_entity_relationships_tool(input_data: EntityRelationshipInput) ->
     try:
         return await get_entity_relationships(
             entity=input_data.entity_name,
-            depth=input_data.depth
+            depth=input_data.depth,
+            relationship_types=input_data.relationship_types
         )
         
     except Exception as e:
@@ -319,6 +337,9 @@ async def get_entity_timeline_tool(input_data: EntityTimelineInput) -> List[Dict
             start_date = datetime.fromisoformat(input_data.start_date)
         if input_data.end_date:
             end_date = datetime.fromisoformat(input_data.end_date)
+            # A bare date includes the whole day
+            if len(input_data.end_date) == 10:
+                end_date += timedelta(days=1, microseconds=-1)
         
         # Get timeline from graph
         timeline = await graph_client.get_entity_timeline(
@@ -4,7 +4,7 @@ Main Pydantic AI agent for agentic RAG with knowledge graph.
 
 import os
 import logging
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, AsyncIterator
 from dataclasses import dataclass
 
 from pydantic_ai import Agent, RunContext
@@ -12,6 +12,7 @@ from dotenv import load_dotenv
 
 from .scheme_helpers.prompts import SYSTEM_PROMPT
 from .scheme_helpers.providers import get_llm_model
+from .scheme_helpers.models import StreamDelta
 from .scheme_helpers.tools import (
     vector_search_tool,
     graph_search_tool,
@@ -255,7 +256,8 @@ async def list_documents(
 async def get_entity_relationships(
     ctx: RunContext[AgentDependencies],
     entity_name: str,
-    depth: int = 2
+    depth: int = 2,
+    relationship_types: Optional[List[str]] = None
 ) -> Dict[str, Any]:
     """
     Get all relationships for a specific entity in the knowledge graph.
@@ -267,13 +269,15 @@ async def get_entity_relationships(
     Args:
         entity_name: Name of the entity to explore (e.g., "Google", "OpenAI")
         depth: Maximum traversal depth for relationships (1-5)
+        relationship_types: Only follow these relationship types (e.g. ["ELIGIBLE_FOR"]), optional
     
     Returns:
         Entity relationships and connected entities with relationship types
     """
     input_data = EntityRelationshipInput(
         entity_name=entity_name,
-        depth=depth
+        depth=depth,
+        relationship_types=relationship_types
     )
     
     return await get_entity_relationships_tool(input_data)
@@ -307,4 +311,58 @@ async def get_entity_timeline(
         end_date=end_date
     )
     
-    return await get_entity_timeline_tool(input_data)
\ No newline at end of file
+    return await get_entity_timeline_tool(input_data)
+
+
+def _scheme_deps(aadhaar_no: Optional[str]) -> AgentDependencies:
+    """Build per-request dependencies; the farmer doubles as the session owner."""
+    return AgentDependencies(session_id=aadhaar_no or "anonymous", user_id=aadhaar_no)
+
+
+def run_scheme_agent(query: str, aadhaar_no: Optional[str] = None) -> str:
+    """
+    Run the scheme RAG agent from synchronous code.
+    
+    Args:
+        query: Farmer query
+        aadhaar_no: Aadhaar number of the farmer, used as the session id
+    
+    Returns:
+        Final agent answer
+    """
+    result = rag_agent.run_sync(query, deps=_scheme_deps(aadhaar_no))
+    return result.output
+
+
+async def arun_scheme_agent(query: str, aadhaar_no: Optional[str] = None) -> str:
+    """
+    Run the scheme RAG agent on the caller's event loop.
+    
+    Args:
+        query: Farmer query
+        aadhaar_no: Aadhaar number of the farmer, used as the session id
+    
+    Returns:
+        Final agent answer
+    """
+    result = await rag_agent.run(query, deps=_scheme_deps(aadhaar_no))
+    return result.output
+
+
+async def astream_scheme_agent(query: str, aadhaar_no: Optional[str] = None) -> AsyncIterator[StreamDelta]:
+    """
+    Run the scheme RAG agent, yielding the final answer as text deltas.
+    
+    Tool calls still run to completion first; only the final answer streams.
+    
+    Args:
+        query: Farmer query
+        aadhaar_no: Aadhaar number of the farmer, used as the session id
+    
+    Yields:
+        Text deltas of the final agent answer
+    """
+    async with rag_agent.run_stream(query, deps=_scheme_deps(aadhaar_no)) as result:
+        async for text in result.stream_text(delta=True):
+            if text:
+                yield StreamDelta(content=text)
@@ -0,0 +1,135 @@
+# Per-session conversation memory for the sowing agent.
+# Each farmer/session gets its own window of the last SOWING_MEMORY_WINDOW
+# exchanges instead of one process-wide buffer shared by every farmer. Sessions
+# are keyed on (aadhaar_no, session_id), so a client-supplied session id never
+# reaches another farmer's history. Idle
+# sessions expire after SOWING_SESSION_TTL seconds and the least recently used
+# are evicted beyond SOWING_SESSION_MAX.
+# With SOWING_MEMORY_BACKEND=postgres the async path also writes turns to the
+# scheme agent's sessions/messages tables and rehydrates a session's window from
+# them after eviction or a restart. The sync path is always in-process only.
+import os
+import json
+import asyncio
+import logging
+import threading
+from typing import Optional, Dict, Any, List, Tuple
+
+from cachetools import TTLCache
+from langchain.memory import ConversationBufferWindowMemory
+
+logger = logging.getLogger(__name__)
+
+SOWING_MEMORY_WINDOW = int(os.getenv("SOWING_MEMORY_WINDOW", "5"))        # exchanges kept in the prompt
+SOWING_SESSION_MAX = int(os.getenv("SOWING_SESSION_MAX", "5000"))
+SOWING_SESSION_TTL = float(os.getenv("SOWING_SESSION_TTL", "1800"))        # idle seconds
+SOWING_MEMORY_BACKEND = os.getenv("SOWING_MEMORY_BACKEND", "memory")       # "memory" or "postgres"
+
+class SessionHistory:
+    """Windowed memory of one session, plus its Postgres session id when persisted."""
+
+    def __init__(self, window: int):
+        self.memory = ConversationBufferWindowMemory(k=window, memory_key="chat_history", return_messages=True)
+        self.pg_session_id: Optional[str] = None
+        self.ready: Optional[asyncio.Future] = None  # Postgres rehydration
+
+    def messages(self) -> List[Any]:
+        return self.memory.load_memory_variables({})["chat_history"]
+
+    def save(self, query: str, answer: str):
+        self.memory.save_context({"input": query}, {"output": answer})
+        # The window only limits what is loaded; drop older turns so the buffer stays bounded
+        messages = self.memory.chat_memory.messages
+        if len(messages) > 2 * self.memory.k:
+            del messages[: len(messages) - 2 * self.memory.k]
+
+def session_key(aadhaar_no: str, session_id: Optional[str] = None) -> Tuple[str, Optional[str]]:
+    return (str(aadhaar_no), session_id)
+
+def _persisted_user_id(key: Tuple[str, Optional[str]]) -> str:
+    # JSON keeps the pair unambiguous whatever characters a session id contains
+    return json.dumps(list(key))
+
+class SessionMemoryStore:
+    def __init__(self, maxsize: int = SOWING_SESSION_MAX, ttl: float = SOWING_SESSION_TTL,
+                 window: int = SOWING_MEMORY_WINDOW, backend: str = SOWING_MEMORY_BACKEND):
+        if backend not in ("memory", "postgres"):
+            raise ValueError(f"Unknown sowing memory backend '{backend}'")
+        self.window = window
+        self.backend = backend
+        # TTLCache drops idle sessions on expiry and evicts in LRU order when full
+        self._sessions = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "persist_errors": 0}
+
+    def _get_or_create(self, key: Tuple[str, Optional[str]]):
+        with self._lock:
+            history = self._sessions.get(key)
+            created = history is None
+            if created:
+                history = SessionHistory(self.window)
+            # Re-set on hits too, so the TTL counts idle time rather than age
+            self._sessions[key] = history
+            self._stats["misses" if created else "hits"] += 1
+        return history, created
+
+    def get(self, aadhaar_no: str, session_id: Optional[str] = None) -> SessionHistory:
+        return self._get_or_create(session_key(aadhaar_no, session_id))[0]
+
+    async def aget(self, aadhaar_no: str, session_id: Optional[str] = None) -> SessionHistory:
+        key = session_key(aadhaar_no, session_id)
+        history, created = self._get_or_create(key)
+        if created and self.backend == "postgres":
+            history.ready = asyncio.ensure_future(self._rehydrate(key, history))
+        if history.ready is not None:
+            await asyncio.shield(history.ready)
+        return history
+
+    async def _rehydrate(self, key: Tuple[str, Optional[str]], history: SessionHistory):
+        user_id = _persisted_user_id(key)
+        try:
+            from .scheme_helpers import db_utils  # needs DATABASE_URL, so only imported for this backend
+            history.pg_session_id = await db_utils.get_user_session(user_id)
+            if history.pg_session_id is None:
+                history.pg_session_id = await db_utils.create_session(
+                    user_id=user_id, metadata={"agent": "sowing"}, timeout_minutes=int(SOWING_SESSION_TTL // 60) or 1)
+                return
+            rows = await db_utils.get_recent_session_messages(history.pg_session_id, 2 * self.window)
+            for row in rows:
+                if row["role"] == "user":
+                    history.memory.chat_memory.add_user_message(row["content"])
+                elif row["role"] == "assistant":
+                    history.memory.chat_memory.add_ai_message(row["content"])
+        except Exception as e:
+            # Conversation history is best effort; the request proceeds without it
+            logger.warning(f"Could not load sowing session {user_id}: {e}")
+            self._count("persist_errors")
+
+    def save(self, history: SessionHistory, query: str, answer: str):
+        history.save(query, answer)
+
+    async def asave(self, history: SessionHistory, query: str, answer: str):
+        history.save(query, answer)
+        if self.backend != "postgres" or history.pg_session_id is None:
+            return
+        try:
+            from .scheme_helpers import db_utils
+            await db_utils.add_message(history.pg_session_id, "user", query)
+            await db_utils.add_message(history.pg_session_id, "assistant", answer)
+        except Exception as e:
+            logger.warning(f"Could not persist sowing session turn: {e}")
+            self._count("persist_errors")
+
+    def drop(self, aadhaar_no: str, session_id: Optional[str] = None):
+        with self._lock:
+            self._sessions.pop(session_key(aadhaar_no, session_id), None)
+
+    def _count(self, key: str):
+        with self._lock:
+            self._stats[key] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats, sessions=len(self._sessions), backend=self.backend)
+
+session_memory = SessionMemoryStore()
@@ -1,23 +1,27 @@
+import os
+import asyncio
+import threading
 import datetime as dt
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple, AsyncIterator
 
 import numpy as np
 import pandas as pd
-import requests
 from db import get_user_and_shc
 from config import OPENAI_API_KEY, OPENWEATHER_API_KEY, FORECAST_HOURS, TOP_K
-from .model import crops_df
+from .crop_catalog import get_crop_catalog
+from .weather_cache import get_weather as cached_weather
+from .scheme_helpers.models import StreamDelta
+from .session_memory import session_memory, SessionHistory
 
 # ---- LangChain
 from langchain_openai import ChatOpenAI
 from langchain.agents import initialize_agent, AgentType, Tool
-from rapidfuzz import process, fuzz
-from langchain.memory import ConversationBufferMemory
+from langchain.prompts import MessagesPlaceholder
 
 refiner_llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.4, openai_api_key=OPENAI_API_KEY)
 
-def refine_response(raw_msg: str) -> str:
-    prompt = f"""
+def _refine_prompt(raw_msg: str) -> str:
+    return f"""
     You are an agricultural advisor. Refine the following technical/raw sowing recommendation
     into a clear, friendly, farmer-understandable message without losing details:
 
@@ -26,12 +30,21 @@ def refine_response(raw_msg: str) -> str:
 
     Refined Farmer-Friendly Response:
     """
+
+def refine_response(raw_msg: str) -> str:
     try:
-        refined = refiner_llm.predict(prompt)
+        refined = refiner_llm.predict(_refine_prompt(raw_msg))
         return refined.strip()
     except Exception as e:
         return raw_msg + f"\n\n(Note: Refinement failed: {e})"
 
+async def arefine_response(raw_msg: str) -> str:
+    try:
+        refined = await refiner_llm.ainvoke(_refine_prompt(raw_msg))
+        return refined.content.strip()
+    except Exception as e:
+        return raw_msg + f"\n\n(Note: Refinement failed: {e})"
+
 # ==============================
 # Core Helpers
 # ==============================
@@ -44,20 +57,7 @@ def detect_season(date: Optional[dt.date] = None) -> str:
 
 def get_weather(lat: float, lon: float, api_key: str = OPENWEATHER_API_KEY) -> Dict[str, Any]:
     try:
-        cur = requests.get(
-            "https://api.openweathermap.org/data/2.5/weather",
-            params={"lat": lat, "lon": lon, "appid": api_key,"units":"metric"}, timeout=10
-        ).json()
-        f = requests.get(
-            "https://api.openweathermap.org/data/2.5/forecast",
-            params={"lat": lat,"lon": lon,"appid": api_key,"units":"metric"}, timeout=10
-        ).json()
-        out = {"current": cur,"forecast": f}
-        if "list" in f:
-            steps = f["list"][: max(1, FORECAST_HOURS//3)]
-            out["avg_temp"] = float(np.mean([s["main"]["temp"] for s in steps])) if steps else None
-            out["avg_rh"]   = float(np.mean([s["main"]["humidity"] for s in steps])) if steps else None
-        return out
+        return cached_weather(lat, lon, api_key, FORECAST_HOURS)
     except: return {"error": "Weather fetch failed"}
 
 def check_soil_deficiency(shc: Dict[str, Any], weather: Optional[Dict[str, Any]] = None) -> List[str]:
@@ -119,14 +119,10 @@ def retrieve_sowing(aadhaar_no: str, crop_name: Optional[str] = None, chosen_shc
     coords = get_weather(float(farmer.get("LAT", 0)), float(farmer.get("LON", 0))) if farmer.get("LAT") and farmer.get("LON") else None
     season = detect_season()
 
-    matches = process.extract(crop_name, crops_df["CROPS"].tolist(), limit=1, scorer=fuzz.WRatio)
-    if not matches: return {"error": f"No crop found matching '{crop_name}'."}
-    best_crop = matches[0][0]
-
-    crop_row = crops_df[crops_df["CROPS"] == best_crop]
-    if not crop_row.empty:
-        season_match = crop_row[crop_row["SEASON"].str.lower() == season.lower()]
-        crop_row = season_match.iloc[0].to_dict() if not season_match.empty else crop_row.iloc[0].to_dict()
+    catalog = get_crop_catalog()
+    best_crop = catalog.match(crop_name)
+    if not best_crop: return {"error": f"No crop found matching '{crop_name}'."}
+    crop_row = catalog.row(best_crop, season)
 
     deficiencies = check_soil_deficiency(selected_shc, coords)
 
@@ -139,6 +135,28 @@ def retrieve_sowing(aadhaar_no: str, crop_name: Optional[str] = None, chosen_shc
         "deficiencies": deficiencies
     }
 
+def sowing_message(out: Dict[str, Any]) -> Tuple[str, bool]:
+    """Raw advice text for a retrieve_sowing result, and whether it should be LLM-refined."""
+    if out.get("ask_crop"): return f"🌱 {out['ask_crop']}", False
+    if out.get("ask_shc"): return f"⚠️ {out['ask_shc']}", False
+    if out.get("error"): return f"❌ {out['error']}", False
+
+    farmer, crop, shc, weather, deficiencies = out["farmer"], out["crop"], out["shc_used"], out["weather"], out["deficiencies"]
+    msg = f"👋 Hi {farmer.get('NAME','Farmer')}!\nSowing advice for {crop['CROPS']}:\n- Season: {crop.get('SEASON','N/A')}\n- Type: {crop.get('TYPE_OF_CROP','N/A')}\n\nSoil & Fertilizer Guidance:\n" + "\n".join([f"- {d}" for d in deficiencies])
+    if weather and weather.get("avg_temp"): msg += f"\n\nWeather Forecast: Temp ~{weather['avg_temp']:.1f}°C, RH ~{weather['avg_rh']:.1f}%"
+    return msg, True
+
+def sowing_advice(aadhaar_no: str, crop_name: str, shc_id: Optional[str] = None) -> str:
+    msg, refine = sowing_message(retrieve_sowing(aadhaar_no, crop_name, shc_id))
+    return refine_response(msg) if refine else msg
+
+def safe_sowing_message(aadhaar_no: str, crop_name: str, shc_id: Optional[str] = None) -> Tuple[str, bool]:
+    """sowing_message for a direct call, failing with the same message as sowing_tool_single_input."""
+    try:
+        return sowing_message(retrieve_sowing(aadhaar_no, crop_name, shc_id))
+    except Exception as e:
+        return f"❌ Error parsing input: {e}", False
+
 # ==============================
 # Tool wrapper
 # ==============================
@@ -168,25 +186,13 @@ def sowing_tool_single_input(query: str) -> str:
         if not aadhaar_no: return "❌ Please provide Aadhaar number."
         if not crop_name: return "❌ Please specify crop name."
 
-        out = retrieve_sowing(aadhaar_no, crop_name, shc_id)
-
-        if out.get("ask_crop"): return f"🌱 {out['ask_crop']}"
-        if out.get("ask_shc"): return f"⚠️ {out['ask_shc']}"
-        if out.get("error"): return f"❌ {out['error']}"
-
-        farmer, crop, shc, weather, deficiencies = out["farmer"], out["crop"], out["shc_used"], out["weather"], out["deficiencies"]
-        msg = f"👋 Hi {farmer.get('NAME','Farmer')}!\nSowing advice for {crop['CROPS']}:\n- Season: {crop.get('SEASON','N/A')}\n- Type: {crop.get('TYPE_OF_CROP','N/A')}\n\nSoil & Fertilizer Guidance:\n" + "\n".join([f"- {d}" for d in deficiencies])
-        if weather and weather.get("avg_temp"): msg += f"\n\nWeather Forecast: Temp ~{weather['avg_temp']:.1f}°C, RH ~{weather['avg_rh']:.1f}%"
-
-        return refine_response(msg)
+        return sowing_advice(aadhaar_no, crop_name, shc_id)
     except Exception as e:
         return f"❌ Error parsing input: {e}"
 
 # ==============================
 # Initialize LangChain agent
 # ==============================
-memory = ConversationBufferMemory(memory_key="chat_history", return_messages=True)
-
 sowing_tool_structured = Tool(
     name="Sowing_Advisory",
     func=sowing_tool_single_input,
@@ -195,17 +201,94 @@ sowing_tool_structured = Tool(
 
 llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.3, openai_api_key=OPENAI_API_KEY)
 
+# Stateless executor shared by all farmers; each call passes its own session's
+# windowed chat_history (see session_memory)
 agent = initialize_agent(
     tools=[sowing_tool_structured],
     llm=llm,
     agent=AgentType.OPENAI_FUNCTIONS,
-    memory=memory,
     verbose=True,
-    return_direct=True
+    return_direct=True,
+    agent_kwargs={"extra_prompt_messages": [MessagesPlaceholder(variable_name="chat_history")]}
 )
 
-def run_sowing_agent(query: str, aadhaar_no: str, crop: Optional[str] = None, chosen_shc_id: Optional[str] = None) -> str:
+def _sowing_agent_input(query: str, aadhaar_no: str, crop: Optional[str], chosen_shc_id: Optional[str]) -> str:
     crop_val = crop if crop else "None"
     shc_val = chosen_shc_id if chosen_shc_id else "None"
-    input_str = f"{query} | Aadhaar:{aadhaar_no} | Crop:{crop_val} | SHC:{shc_val}"
-    return agent.run(input_str)
\ No newline at end of file
+    return f"{query} | Aadhaar:{aadhaar_no} | Crop:{crop_val} | SHC:{shc_val}"
+
+def _agent_inputs(query: str, aadhaar_no: str, crop: Optional[str], chosen_shc_id: Optional[str],
+                  history: SessionHistory) -> Dict[str, Any]:
+    return {"input": _sowing_agent_input(query, aadhaar_no, crop, chosen_shc_id), "chat_history": history.messages()}
+
+# ==============================
+# Run Agent
+# ==============================
+# "direct": when classify_intent already extracted the crop, call the tool logic
+# directly (one refine LLM call); the agent only handles queries without a crop.
+# "agent": always go through the agent, kept for comparison.
+SOWING_AGENT_MODE = os.getenv("SOWING_AGENT_MODE", "direct")
+
+_sowing_stats_lock = threading.Lock()
+_sowing_stats = {"direct": 0, "agent": 0}
+
+def _use_direct(crop: Optional[str]) -> bool:
+    direct = SOWING_AGENT_MODE == "direct" and bool(crop)
+    with _sowing_stats_lock:
+        _sowing_stats["direct" if direct else "agent"] += 1
+    return direct
+
+def get_sowing_stats() -> Dict[str, int]:
+    with _sowing_stats_lock:
+        return dict(_sowing_stats)
+
+def run_sowing_agent(query: str, aadhaar_no: str, crop: Optional[str] = None, chosen_shc_id: Optional[str] = None,
+                     session_id: Optional[str] = None) -> str:
+    history = session_memory.get(aadhaar_no, session_id)
+    if _use_direct(crop):
+        msg, refine = safe_sowing_message(aadhaar_no, crop, chosen_shc_id)
+        answer = refine_response(msg) if refine else msg
+    else:
+        answer = agent.invoke(_agent_inputs(query, aadhaar_no, crop, chosen_shc_id, history))["output"]
+    session_memory.save(history, query, answer)
+    return answer
+
+async def arun_sowing_agent(query: str, aadhaar_no: str, crop: Optional[str] = None, chosen_shc_id: Optional[str] = None,
+                            session_id: Optional[str] = None) -> str:
+    history = await session_memory.aget(aadhaar_no, session_id)
+    if _use_direct(crop):
+        # Mongo/weather lookups are blocking; only the refine call runs on the loop
+        msg, refine = await asyncio.to_thread(safe_sowing_message, aadhaar_no, crop, chosen_shc_id)
+        answer = await arefine_response(msg) if refine else msg
+    else:
+        result = await agent.ainvoke(_agent_inputs(query, aadhaar_no, crop, chosen_shc_id, history))
+        answer = result["output"]
+    await session_memory.asave(history, query, answer)
+    return answer
+
+async def astream_sowing_agent(query: str, aadhaar_no: str, crop: Optional[str] = None,
+                               chosen_shc_id: Optional[str] = None,
+                               session_id: Optional[str] = None) -> AsyncIterator[StreamDelta]:
+    """Streaming variant of arun_sowing_agent; the direct path streams the refined advice token by token."""
+    history = await session_memory.aget(aadhaar_no, session_id)
+    parts = []
+    if not _use_direct(crop):
+        result = await agent.ainvoke(_agent_inputs(query, aadhaar_no, crop, chosen_shc_id, history))
+        parts.append(result["output"])
+        yield StreamDelta(content=result["output"])
+    else:
+        msg, refine = await asyncio.to_thread(safe_sowing_message, aadhaar_no, crop, chosen_shc_id)
+        if not refine:
+            parts.append(msg)
+            yield StreamDelta(content=msg)
+        else:
+            try:
+                async for chunk in refiner_llm.astream(_refine_prompt(msg)):
+                    if chunk.content:
+                        parts.append(chunk.content)
+                        yield StreamDelta(content=chunk.content)
+            except Exception as e:
+                note = f"\n\n(Note: Refinement failed: {e})"
+                parts = [msg, note]
+                yield StreamDelta(content=msg + note)
+    await session_memory.asave(history, query, "".join(parts))
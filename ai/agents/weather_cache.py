@@ -0,0 +1,179 @@
+# Shared OpenWeather cache for the presowing and sowing agents.
+# Farmers in the same village get the same forecast, and OpenWeather only
+# publishes a new forecast step every 3 hours, so responses are cached per
+# rounded lat/lon grid cell until the next 3-hour boundary.
+import os, math, time, threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Optional, Dict, Any, Tuple
+
+import numpy as np
+import requests
+from utils.kvstore import KVStore
+
+OPENWEATHER_URL = "https://api.openweathermap.org/data/2.5/{endpoint}"
+FORECAST_STEP_SECONDS = 3 * 3600
+GRID_DEG = float(os.getenv("WEATHER_GRID_DEG", "0.1"))              # ~11 km cells
+STALE_GRACE_SECONDS = float(os.getenv("WEATHER_STALE_GRACE", "3600"))  # serve stale while refreshing
+WEATHER_CACHE_SIZE = int(os.getenv("WEATHER_CACHE_SIZE", "20000"))
+WEATHER_CACHE_PATH = os.getenv("WEATHER_CACHE_PATH")                  # optional SQLite file
+
+def grid_cell(lat: float, lon: float, grid: float = GRID_DEG) -> Tuple[float, float]:
+    """Snap coordinates to the centre of their grid cell."""
+    return (round((math.floor(lat / grid) + 0.5) * grid, 4),
+            round((math.floor(lon / grid) + 0.5) * grid, 4))
+
+def next_forecast_step(now: Optional[float] = None) -> float:
+    # Epoch multiples of 3h line up with OpenWeather's 00/03/06... UTC forecast steps
+    now = time.time() if now is None else now
+    return (math.floor(now / FORECAST_STEP_SECONDS) + 1) * FORECAST_STEP_SECONDS
+
+def summarize_weather(raw: Dict[str, Any], forecast_hours: int) -> Dict[str, Any]:
+    """Attach average temperature / humidity over the next `forecast_hours` to a raw payload."""
+    out = {"current": raw["current"], "forecast": raw["forecast"]}
+    f = raw["forecast"]
+    if "list" in f:
+        steps = f["list"][: max(1, forecast_hours // 3)]
+        temps = [s["main"]["temp"] for s in steps if "main" in s]
+        rhs = [s["main"]["humidity"] for s in steps if "main" in s]
+        out["avg_temp"] = float(np.mean(temps)) if temps else None
+        out["avg_rh"] = float(np.mean(rhs)) if rhs else None
+    return out
+
+class WeatherCache:
+    """
+    Read-through cache of raw OpenWeather current + forecast payloads.
+    - Keyed on grid cell; entries expire at the next 3-hour forecast step.
+    - Concurrent misses for one cell are coalesced into a single upstream fetch.
+    - Entries up to STALE_GRACE_SECONDS past expiry are served immediately while
+      a background refresh runs, keeping the 10s HTTP timeout off the hot path.
+    - Optionally persisted to SQLite so restarts start warm. The disk layer is best
+      effort: if it cannot be read or written the in-memory cache carries on alone.
+    """
+
+    def __init__(self, maxsize: int = WEATHER_CACHE_SIZE, persist_path: Optional[str] = WEATHER_CACHE_PATH,
+                 stale_grace: float = STALE_GRACE_SECONDS):
+        self.maxsize = maxsize
+        self.stale_grace = stale_grace
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._store = KVStore(persist_path, table="weather") if persist_path else None
+        self._http = ThreadPoolExecutor(max_workers=8, thread_name_prefix="weather-http")
+        self._refresher = ThreadPoolExecutor(max_workers=2, thread_name_prefix="weather-refresh")
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0, "upstream_calls": 0, "errors": 0, "store_errors": 0}
+
+    @staticmethod
+    def _key(cell: Tuple[float, float]) -> str:
+        return f"{cell[0]:.4f},{cell[1]:.4f}"
+
+    def _fetch_endpoint(self, endpoint: str, lat: float, lon: float, api_key: str) -> Dict[str, Any]:
+        return requests.get(OPENWEATHER_URL.format(endpoint=endpoint),
+            params={"lat": lat, "lon": lon, "appid": api_key, "units": "metric"}, timeout=10).json()
+
+    def _fetch(self, cell: Tuple[float, float], api_key: str) -> Dict[str, Any]:
+        with self._lock:
+            self._stats["upstream_calls"] += 1
+        cur_job = self._http.submit(self._fetch_endpoint, "weather", cell[0], cell[1], api_key)
+        forecast = self._fetch_endpoint("forecast", cell[0], cell[1], api_key)
+        return {"current": cur_job.result(), "forecast": forecast}
+
+    def _store_entry(self, key: str, raw: Dict[str, Any]):
+        # Only cache well-formed payloads; OpenWeather reports errors in-band with HTTP 200 bodies
+        if "list" not in raw["forecast"] or "main" not in raw["current"]:
+            return
+        entry = {"expires_at": next_forecast_step(), "payload": raw}
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        if self._store:
+            try:
+                self._store.set(key, entry)
+            except Exception as e:
+                print("Weather cache store write failed:", e)
+                with self._lock:
+                    self._stats["store_errors"] += 1
+
+    def _lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        # Called with self._lock held
+        entry = self._entries.get(key)
+        if entry is None and self._store:
+            try:
+                entry = self._store.get(key)
+            except Exception as e:
+                print("Weather cache store read failed:", e)
+                self._stats["store_errors"] += 1
+                entry = None
+            if entry:
+                self._entries[key] = entry
+        if entry:
+            self._entries.move_to_end(key)
+        return entry
+
+    def _load(self, key: str, cell: Tuple[float, float], api_key: str, job: Future):
+        try:
+            raw = self._fetch(cell, api_key)
+            self._store_entry(key, raw)
+            job.set_result(raw)
+        except Exception as e:
+            with self._lock:
+                self._stats["errors"] += 1
+            job.set_exception(e)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def get(self, lat: float, lon: float, api_key: str) -> Dict[str, Any]:
+        """Return {"current": ..., "forecast": ...} for the grid cell containing (lat, lon)."""
+        cell = grid_cell(lat, lon)
+        key = self._key(cell)
+        now = time.time()
+        owner = False
+        with self._lock:
+            entry = self._lookup(key)
+            if entry and entry["expires_at"] > now:
+                self._stats["hits"] += 1
+                return entry["payload"]
+            job = self._inflight.get(key)
+            if entry and entry["expires_at"] + self.stale_grace > now:
+                self._stats["stale_hits"] += 1
+                if job is None:
+                    job = self._inflight[key] = Future()
+                    self._refresher.submit(self._load, key, cell, api_key, job)
+                return entry["payload"]
+            if job is not None:
+                self._stats["coalesced"] += 1
+            else:
+                self._stats["misses"] += 1
+                job = self._inflight[key] = Future()
+                owner = True
+        if owner:
+            self._load(key, cell, api_key, job)
+        return job.result()
+
+    def invalidate(self, lat: float, lon: float):
+        key = self._key(grid_cell(lat, lon))
+        with self._lock:
+            self._entries.pop(key, None)
+        if self._store:
+            try:
+                self._store.delete(key)
+            except Exception as e:
+                print("Weather cache store delete failed:", e)
+                with self._lock:
+                    self._stats["store_errors"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats, size=len(self._entries))
+        lookups = stats["hits"] + stats["stale_hits"] + stats["misses"] + stats["coalesced"]
+        stats["hit_rate"] = (stats["hits"] + stats["stale_hits"]) / lookups if lookups else 0.0
+        return stats
+
+weather_cache = WeatherCache()
+
+def get_weather(lat: float, lon: float, api_key: str, forecast_hours: int) -> Dict[str, Any]:
+    """Cached current weather + forecast with averages; raises on upstream failure."""
+    return summarize_weather(weather_cache.get(lat, lon, api_key), forecast_hours)
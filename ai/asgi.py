@@ -0,0 +1,10 @@
+# Async serving mode: uvicorn asgi:app --host 0.0.0.0 --port 5000
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from routes.async_query_route import routes as query_routes
+
+app = Starlette(routes=[Mount("/api", routes=query_routes)])
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=5000)
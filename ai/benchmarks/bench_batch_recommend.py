@@ -0,0 +1,53 @@
+# Per-row vs batched crop recommendation throughput.
+# Run from ai/:  python -m benchmarks.bench_batch_recommend --records 5000
+import argparse, random, time
+
+from agents.presowing_agent import (
+    recommend_crops_batch, _vectorize, _feature_row, _crop_results, detect_season
+)
+from agents.model import get_index, get_preprocessor
+
+def synthetic_shc_records(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    soils = [c for c in get_preprocessor().named_transformers_["cat"].categories_[0] if isinstance(c, str)] or ["Loamy"]
+    return [
+        {
+            "AADHAAR_NO": 100000000000 + i,
+            "SURVEY_NO": f"S{i}",
+            "PH": round(rng.uniform(4.5, 8.5), 2),
+            "N_(KG/HA)": round(rng.uniform(100, 500), 1),
+            "P_(KG/HA)": round(rng.uniform(5, 50), 1),
+            "K_(KG/HA)": round(rng.uniform(50, 400), 1),
+            "SOIL_TYPE": rng.choice(soils),
+        }
+        for i in range(n)
+    ]
+
+def per_row(records, season, topk):
+    for shc in records:
+        D, I = get_index().search(_vectorize([_feature_row(shc, season)]), topk)
+        _crop_results(D[0], I[0])
+
+def batched(records, season, topk, batch_size):
+    for _ in recommend_crops_batch(records, season=season, topk=topk, batch_size=batch_size):
+        pass
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=5000)
+    parser.add_argument("--topk", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=4096)
+    args = parser.parse_args()
+
+    records = synthetic_shc_records(args.records)
+    season = detect_season()
+
+    for name, fn in (("per-row", lambda: per_row(records, season, args.topk)),
+                     ("batched", lambda: batched(records, season, args.topk, args.batch_size))):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        print(f"{name:>8}: {elapsed:8.3f}s  {args.records / elapsed:10.1f} records/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# pre.transform(DataFrame) vs FastEncoder.encode for the single-request path,
+# plus a bit-equivalence check over the same rows.
+# Run from ai/:  python -m benchmarks.bench_fast_encoder --rows 2000
+import argparse, random, time
+
+from agents.model import get_preprocessor
+from agents.fast_encoder import FastEncoder, check_equivalence, probe_rows
+from agents.presowing_agent import _feature_row, detect_season
+
+def synthetic_rows(pre, n: int, seed: int = 0):
+    rng = random.Random(seed)
+    soils = [c for c in pre.named_transformers_["cat"].categories_[0] if isinstance(c, str)] or ["Loamy"]
+    season = detect_season()
+    rows = []
+    for _ in range(n):
+        shc = {
+            "PH": round(rng.uniform(4.5, 8.5), 2),
+            "N_(KG/HA)": round(rng.uniform(100, 500), 1),
+            "P_(KG/HA)": round(rng.uniform(5, 50), 1),
+            "K_(KG/HA)": round(rng.uniform(50, 400), 1),
+            "SOIL_TYPE": rng.choice(soils + [None]),
+        }
+        rows.append(_feature_row(shc, season, rng.choice([None, "Rainfed", "Irrigated"])))
+    return rows
+
+def main():
+    import pandas as pd
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2000)
+    args = parser.parse_args()
+
+    pre = get_preprocessor()
+    encoder = FastEncoder.from_preprocessor(pre)
+    rows = synthetic_rows(pre, args.rows)
+    ok = check_equivalence(encoder, pre, rows + probe_rows(encoder))
+    print(f"bit-equivalent on {len(rows)} rows + probes: {ok}")
+
+    start = time.perf_counter()
+    for row in rows:
+        Xq = pre.transform(pd.DataFrame([row]))
+        if hasattr(Xq, "toarray"):
+            Xq = Xq.toarray()
+    sklearn_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for row in rows:
+        encoder.encode(row)
+    fast_s = time.perf_counter() - start
+
+    print(f"pre.transform: {sklearn_s / len(rows) * 1e6:9.1f} us/row")
+    print(f"FastEncoder:   {fast_s / len(rows) * 1e6:9.1f} us/row  ({sklearn_s / fast_s:.0f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# Two-query find_one/find vs single $lookup aggregation for the user + SHC fetch.
+# Run from ai/ against a local mongod (never production):
+#   python -m benchmarks.bench_mongo_lookup --uri mongodb://localhost:27017 --seed 100000 --queries 2000
+import argparse, random, statistics, time
+
+from pymongo import MongoClient
+from db import fetch_user_and_shc, ensure_indexes
+
+def two_query_lookup(database, aadhaar_no: str):
+    # The previous implementation, kept here as the baseline
+    user = database["aadhar"].find_one({"AADHAAR_NO": aadhaar_no}, {"_id": 0})
+    if not user:
+        return {"error": f"No user found with Aadhaar: {aadhaar_no}"}
+    shcs = list(database["shc_norm"].find({"AADHAAR_NO": int(aadhaar_no)}, {"_id": 0}))
+    return {"user": user, "shc_details": shcs}
+
+def seed(database, farmers: int, shcs_per_farmer: int = 2):
+    rng = random.Random(0)
+    database["aadhar"].drop()
+    database["shc_norm"].drop()
+    batch_users, batch_shcs = [], []
+    for i in range(farmers):
+        aadhaar = 100000000000 + i
+        batch_users.append({"AADHAAR_NO": str(aadhaar), "NAME": f"Farmer {i}", "DISTRICT": "Pune",
+                            "STATE": "Maharashtra", "LAT": 18.52, "LON": 73.86, "PHONE": "9" * 10})
+        for s in range(shcs_per_farmer):
+            batch_shcs.append({"AADHAAR_NO": aadhaar, "SURVEY_NO": f"{i}/{s}", "SOIL_TYPE": "Black",
+                               "PH": round(rng.uniform(5, 8.5), 2), "N_(KG/HA)": rng.uniform(100, 500),
+                               "P_(KG/HA)": rng.uniform(5, 50), "K_(KG/HA)": rng.uniform(50, 400),
+                               "EC": rng.uniform(0, 2), "OC": rng.uniform(0, 1), "ZN": rng.uniform(0, 2)})
+        if len(batch_users) >= 5000:
+            database["aadhar"].insert_many(batch_users)
+            database["shc_norm"].insert_many(batch_shcs)
+            batch_users, batch_shcs = [], []
+    if batch_users:
+        database["aadhar"].insert_many(batch_users)
+        database["shc_norm"].insert_many(batch_shcs)
+
+def timed(fn, database, ids):
+    samples = []
+    for aadhaar in ids:
+        start = time.perf_counter()
+        fn(database, aadhaar)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uri", default="mongodb://localhost:27017")
+    parser.add_argument("--db", default="krishi_bench")
+    parser.add_argument("--seed", type=int, default=0, help="(re)create N synthetic farmers first")
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    database = MongoClient(args.uri)[args.db]
+    if args.seed:
+        seed(database, args.seed)
+    ensure_indexes(database)
+
+    farmers = database["aadhar"].estimated_document_count()
+    rng = random.Random(1)
+    ids = [str(100000000000 + rng.randrange(farmers)) for _ in range(args.queries)]
+    for name, fn in (("find_one + find", two_query_lookup), ("$lookup aggregate", fetch_user_and_shc)):
+        p50, p95 = timed(fn, database, ids)
+        print(f"{name:>18}: p50 {p50:6.2f} ms   p95 {p95:6.2f} ms   ({farmers} farmers)")
+
+if __name__ == "__main__":
+    main()
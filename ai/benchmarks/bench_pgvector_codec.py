@@ -0,0 +1,78 @@
+# Text vs binary transfer of pgvector embeddings and jsonb metadata, per query.
+# Always measures client-side encode/decode; with --dsn also times round trips of
+# `SELECT $1::vector, $2::jsonb` over a plain connection vs one set up by db_utils.
+# Run from ai/:  python -m benchmarks.bench_pgvector_codec --dim 1536 --queries 2000 [--dsn postgresql://...]
+import os, json, time, asyncio, argparse
+
+import numpy as np
+
+os.environ.setdefault("DATABASE_URL", "postgresql://localhost/unused")  # pool is created lazily; not used here
+from agents.scheme_helpers.db_utils import _encode_vector, _decode_vector, _encode_jsonb, _decode_jsonb, _init_connection
+
+METADATA = {"source": "pm-kisan.pdf", "page": 3, "chunk_method": "semantic", "scheme": "PM-KISAN", "tags": ["income", "support"]}
+
+def per_query_us(fn, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n * 1e6
+
+def client_side(dim: int, n: int):
+    embedding = np.random.default_rng(0).standard_normal(dim).astype(np.float32).tolist()
+    text_literal = "[" + ",".join(map(str, embedding)) + "]"
+    binary = _encode_vector(embedding)
+    metadata_text = json.dumps(METADATA)
+    metadata_binary = _encode_jsonb(METADATA)
+
+    rows = [
+        ("vector encode, text literal", lambda: "[" + ",".join(map(str, embedding)) + "]"),
+        ("vector encode, binary",       lambda: _encode_vector(embedding)),
+        ("vector decode, text literal", lambda: np.array(text_literal[1:-1].split(","), dtype=np.float32)),
+        ("vector decode, binary",       lambda: _decode_vector(binary)),
+        ("jsonb decode, json.loads",    lambda: json.loads(metadata_text)),
+        ("jsonb decode, codec",         lambda: _decode_jsonb(metadata_binary)),
+    ]
+    print(f"client side, dim={dim}: text literal {len(text_literal)} bytes, binary {len(binary)} bytes")
+    for name, fn in rows:
+        print(f"  {name:30s} {per_query_us(fn, n):9.1f} us/query")
+
+async def round_trips(dsn: str, dim: int, n: int):
+    import asyncpg
+
+    embedding = np.random.default_rng(0).standard_normal(dim).astype(np.float32).tolist()
+    plain = await asyncpg.connect(dsn)
+    codec = await asyncpg.connect(dsn)
+    await _init_connection(codec)
+    try:
+        start = time.perf_counter()
+        for _ in range(n):
+            row = await plain.fetchrow("SELECT $1::vector AS v, $2::jsonb AS m",
+                                       "[" + ",".join(map(str, embedding)) + "]", json.dumps(METADATA))
+            np.array(row["v"][1:-1].split(","), dtype=np.float32), json.loads(row["m"])
+        text_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(n):
+            await codec.fetchrow("SELECT $1::vector AS v, $2::jsonb AS m", embedding, METADATA)
+        binary_s = time.perf_counter() - start
+    finally:
+        await plain.close()
+        await codec.close()
+
+    print(f"round trip, dim={dim}:")
+    print(f"  text   {text_s / n * 1e6:9.1f} us/query")
+    print(f"  binary {binary_s / n * 1e6:9.1f} us/query  ({text_s / binary_s:.1f}x)")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--dsn", default=None)
+    args = parser.parse_args()
+
+    client_side(args.dim, args.queries)
+    if args.dsn:
+        asyncio.run(round_trips(args.dsn, args.dim, args.queries))
+
+if __name__ == "__main__":
+    main()
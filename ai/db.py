@@ -1,35 +1,210 @@
 # utils/mongo_utils.py
 
-from pymongo import MongoClient
-from typing import Optional, Dict, Any
+import os
+import copy
+import threading
+from pymongo import MongoClient, AsyncMongoClient, ASCENDING
+from pymongo.database import Database
+from cachetools import TTLCache
+from typing import Optional, Dict, Any, List
 from config import MONGO_URI, DB_NAME
 
 # MongoDB connection setup
-client = MongoClient(MONGO_URI)
+# Shared pool/timeout tuning for the sync and async clients; fail fast instead of
+# blocking a worker for pymongo's 30s default server selection when Atlas is slow.
+MONGO_CLIENT_OPTIONS = {
+    "maxPoolSize": int(os.getenv("MONGO_MAX_POOL_SIZE", "100")),
+    "minPoolSize": int(os.getenv("MONGO_MIN_POOL_SIZE", "5")),
+    "maxIdleTimeMS": int(os.getenv("MONGO_MAX_IDLE_MS", "300000")),
+    "serverSelectionTimeoutMS": int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000")),
+    "connectTimeoutMS": int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000")),
+    "socketTimeoutMS": int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "10000")),
+    "retryReads": True,
+}
+
+client = MongoClient(MONGO_URI, **MONGO_CLIENT_OPTIONS)
 db = client[DB_NAME]
 
+# The async client binds to the event loop that first uses it, so it is created lazily
+_async_client: Optional[AsyncMongoClient] = None
+
+def get_async_db():
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncMongoClient(MONGO_URI, **MONGO_CLIENT_OPTIONS)
+    return _async_client[DB_NAME]
+
+# Only the fields the agents actually read are shipped back from Mongo
+USER_FIELDS = ["AADHAAR_NO", "NAME", "DISTRICT", "STATE", "LAT", "LON"]
+SHC_FIELDS = ["AADHAAR_NO", "SURVEY_NO", "SOIL_TYPE", "PH", "N_(KG/HA)", "P_(KG/HA)", "K_(KG/HA)", "N", "P", "K"]
+
+def _projection(fields: Optional[List[str]]) -> Dict[str, int]:
+    return {"_id": 0, **{f: 1 for f in fields}} if fields else {"_id": 0}
+
+def _numeric_aadhaar(aadhaar_no: str) -> Optional[int]:
+    try:
+        return int(aadhaar_no)
+    except (TypeError, ValueError):
+        return None
+
+def _user_and_shc_pipeline(aadhaar_no: str, shc_chosen: Optional[str] = None,
+                           user_fields: Optional[List[str]] = USER_FIELDS,
+                           shc_fields: Optional[List[str]] = SHC_FIELDS) -> List[Dict[str, Any]]:
+    # aadhar stores AADHAAR_NO as a string, shc_norm as an int
+    shc_query = {"AADHAAR_NO": _numeric_aadhaar(aadhaar_no)}
+    if shc_chosen:
+        shc_query["SURVEY_NO"] = shc_chosen
+    return [
+        {"$match": {"AADHAAR_NO": aadhaar_no}},
+        {"$limit": 1},
+        {"$project": _projection(user_fields)},
+        # Uncorrelated sub-pipeline with literal values, so it uses the (AADHAAR_NO, SURVEY_NO) index
+        {"$lookup": {
+            "from": "shc_norm",
+            "pipeline": [{"$match": shc_query}, {"$project": _projection(shc_fields)}],
+            "as": "shc_details",
+        }},
+    ]
+
+def fetch_user_and_shc(database: Database, aadhaar_no: str, shc_chosen: Optional[str] = None,
+                       user_fields: Optional[List[str]] = USER_FIELDS,
+                       shc_fields: Optional[List[str]] = SHC_FIELDS) -> Dict[str, Any]:
+    """Single aggregation round trip returning the user document with its SHC records."""
+    if _numeric_aadhaar(aadhaar_no) is None:
+        return _unpack_user_and_shc([], aadhaar_no)  # cannot match any farmer
+    docs = list(database["aadhar"].aggregate(
+        _user_and_shc_pipeline(aadhaar_no, shc_chosen, user_fields, shc_fields)
+    ))
+    return _unpack_user_and_shc(docs, aadhaar_no)
+
+async def afetch_user_and_shc(database, aadhaar_no: str, shc_chosen: Optional[str] = None,
+                              user_fields: Optional[List[str]] = USER_FIELDS,
+                              shc_fields: Optional[List[str]] = SHC_FIELDS) -> Dict[str, Any]:
+    """Async (AsyncMongoClient) variant of fetch_user_and_shc."""
+    if _numeric_aadhaar(aadhaar_no) is None:
+        return _unpack_user_and_shc([], aadhaar_no)
+    cursor = await database["aadhar"].aggregate(
+        _user_and_shc_pipeline(aadhaar_no, shc_chosen, user_fields, shc_fields)
+    )
+    return _unpack_user_and_shc(await cursor.to_list(), aadhaar_no)
+
+def _unpack_user_and_shc(docs: List[Dict[str, Any]], aadhaar_no: str) -> Dict[str, Any]:
+    if not docs:
+        return {"error": f"No user found with Aadhaar: {aadhaar_no}"}
+
+    user = docs[0]
+    shcs = user.pop("shc_details", [])
+    return {
+        "user": user,
+        "shc_details": shcs if shcs else "No SHC records found"
+    }
+
+# ---- Read-through farmer cache
+# One entry per farmer holding the user document and *all* SHC records, so any
+# shc_chosen is served from the same entry and invalidation is a single key.
+FARMER_CACHE_SIZE = int(os.getenv("FARMER_CACHE_SIZE", "10000"))
+FARMER_CACHE_TTL = float(os.getenv("FARMER_CACHE_TTL", "600"))
+
+_farmer_cache = TTLCache(maxsize=FARMER_CACHE_SIZE, ttl=FARMER_CACHE_TTL)
+_farmer_cache_lock = threading.Lock()
+_farmer_cache_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+def _cache_get(aadhaar_no: str) -> Optional[Dict[str, Any]]:
+    with _farmer_cache_lock:
+        entry = _farmer_cache.get(aadhaar_no)
+        _farmer_cache_stats["hits" if entry is not None else "misses"] += 1
+        return entry
+
+def _cache_put(aadhaar_no: str, entry: Dict[str, Any]):
+    with _farmer_cache_lock:
+        _farmer_cache[aadhaar_no] = entry
+
+def _select_shc(entry: Dict[str, Any], shc_chosen: Optional[str]) -> Dict[str, Any]:
+    # Callers get their own copy so they cannot mutate the cached documents
+    entry = copy.deepcopy(entry)
+    shcs = entry["shc_details"]
+    if shc_chosen and isinstance(shcs, list):
+        shcs = [s for s in shcs if s.get("SURVEY_NO") == shc_chosen]
+    return {"user": entry["user"], "shc_details": shcs if shcs else "No SHC records found"}
+
 def get_user_and_shc(aadhaar_no: str, shc_chosen: Optional[str] = None) -> Dict[str, Any]:
     """
     Fetch user details and SHC details for a given Aadhaar number.
-    
+    Served from the process-level farmer cache when possible.
+
     :param aadhaar_no: Aadhaar number of the farmer (string).
     :param shc_chosen: Optional. Specific SURVEY_NO of SHC to fetch. If None, fetch all SHCs.
     :return: Dictionary with user details and SHC details.
     """
+    entry = _cache_get(aadhaar_no)
+    if entry is None:
+        entry = fetch_user_and_shc(db, aadhaar_no)
+        if "error" in entry:
+            return entry  # unknown farmers are not cached
+        _cache_put(aadhaar_no, entry)
+    return _select_shc(entry, shc_chosen)
 
-    # Fetch user details
-    user = db["aadhar"].find_one({"AADHAAR_NO": aadhaar_no}, {"_id": 0})
-    if not user:
-        return {"error": f"No user found with Aadhaar: {aadhaar_no}"}
+async def aget_user_and_shc(aadhaar_no: str, shc_chosen: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Async counterpart of get_user_and_shc sharing the same farmer cache, so a lookup
+    awaited early in a request (alongside LLM/weather calls) warms later sync reads.
+    """
+    entry = _cache_get(aadhaar_no)
+    if entry is None:
+        entry = await afetch_user_and_shc(get_async_db(), aadhaar_no)
+        if "error" in entry:
+            return entry
+        _cache_put(aadhaar_no, entry)
+    return _select_shc(entry, shc_chosen)
 
-    # Fetch SHC details
-    shc_query = {"AADHAAR_NO": int(aadhaar_no)}
-    if shc_chosen:
-        shc_query["SURVEY_NO"] = shc_chosen
+def invalidate_farmer(aadhaar_no) -> None:
+    """Drop a farmer's cached profile/SHC records, e.g. after an SHC update."""
+    with _farmer_cache_lock:
+        if _farmer_cache.pop(str(aadhaar_no), None) is not None:
+            _farmer_cache_stats["invalidations"] += 1
 
-    shcs = list(db["shc_norm"].find(shc_query, {"_id": 0}))
+def clear_farmer_cache() -> None:
+    with _farmer_cache_lock:
+        _farmer_cache_stats["invalidations"] += len(_farmer_cache)
+        _farmer_cache.clear()
 
-    return {
-        "user": user,
-        "shc_details": shcs if shcs else "No SHC records found"
-    }
+def farmer_cache_stats() -> Dict[str, Any]:
+    with _farmer_cache_lock:
+        stats = dict(_farmer_cache_stats, size=len(_farmer_cache))
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    return stats
+
+def start_invalidation_watcher(database: Database = db) -> threading.Thread:
+    """
+    Invalidate cached farmers whenever aadhar / shc_norm change (requires a replica set,
+    e.g. Atlas). Deletes carry no document, so they flush the whole cache.
+    """
+    def watch():
+        pipeline = [{"$match": {"ns.coll": {"$in": ["aadhar", "shc_norm"]}}}]
+        with database.watch(pipeline, full_document="updateLookup") as stream:
+            for change in stream:
+                doc = change.get("fullDocument")
+                if doc and "AADHAAR_NO" in doc:
+                    invalidate_farmer(doc["AADHAAR_NO"])
+                else:
+                    clear_farmer_cache()
+
+    thread = threading.Thread(target=watch, name="farmer-cache-invalidator", daemon=True)
+    thread.start()
+    return thread
+
+def ensure_indexes(database: Database = db) -> List[str]:
+    """
+    Create the indexes get_user_and_shc relies on. Idempotent; safe to run on every deploy.
+    The compound shc_norm index also serves AADHAAR_NO-only lookups as its prefix.
+    """
+    return [
+        database["aadhar"].create_index([("AADHAAR_NO", ASCENDING)], name="aadhaar_no"),
+        database["shc_norm"].create_index([("AADHAAR_NO", ASCENDING), ("SURVEY_NO", ASCENDING)],
+                                          name="aadhaar_no_survey_no"),
+    ]
+
+if __name__ == "__main__":
+    # python db.py  -> bootstrap indexes
+    print("Indexes ready:", ensure_indexes())
@@ -0,0 +1,129 @@
+import time
+import asyncio
+from typing import Dict
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from sse_starlette.sse import EventSourceResponse
+from agents.intent_model import aclassify_intent
+from agents.presowing_agent import arun_crop_agent, astream_crop_agent
+from agents.sowing_agent import arun_sowing_agent, astream_sowing_agent
+from agents.scheme_model import arun_scheme_agent, astream_scheme_agent
+from agents.scheme_helpers.models import StreamDelta
+from db import aget_user_and_shc
+
+async def _prefetch_farmer(aadhaar_no: str):
+    # Warms the farmer cache while the intent is classified; agents report their own errors
+    try:
+        await aget_user_and_shc(aadhaar_no)
+    except Exception as e:
+        print("Farmer prefetch failed:", e)
+
+async def _query_params(request: Request):
+    try:
+        data = await request.json()
+    except ValueError:
+        return None, JSONResponse({"error": "Invalid JSON body"}, status_code=400)
+    if not data.get("aadhaar_no") or not data.get("query"):
+        return None, JSONResponse({"error": "aadhaar_no and query required"}, status_code=400)
+    return data, None
+
+async def handle_query(request: Request):
+    """
+    Async counterpart of routes.query_route.handle_query.
+    Every stage is awaited on the server's event loop, so one worker can
+    hold many in-flight farmer queries while they wait on Mongo, weather and LLMs.
+
+    Expected JSON input:
+        {
+            "aadhaar_no": "<AADHAAR_NUMBER>",
+            "query": "<USER_QUERY>",
+            "chosen_shc_id": "<OPTIONAL_SHC_ID>",
+            "session_id": "<OPTIONAL_SESSION_ID>"
+        }
+
+    Returns:
+        JSON response with intent, agent output, and metadata.
+    """
+    data, error = await _query_params(request)
+    if error:
+        return error
+    aadhaar_no = data.get("aadhaar_no")
+    query = data.get("query")
+    chosen_shc_id = data.get("chosen_shc_id")  # Optional SHC selection
+    session_id = data.get("session_id")  # Optional conversation id, scoped to the farmer
+
+    # Step 1: Classify intent (Mongo lookup overlaps with it)
+    intent_result, _ = await asyncio.gather(aclassify_intent(query), _prefetch_farmer(aadhaar_no))
+    intent = intent_result.intent
+    crop_name = intent_result.crop_name  # Optional crop extracted by intent model
+
+    # Step 2: Route to correct agent
+    if intent == "pre-sowing":
+        response = await arun_crop_agent(user_query=query, aadhaar_no=aadhaar_no, chosen_shc_id=chosen_shc_id)
+    elif intent == "sowing":
+        response = await arun_sowing_agent(query=query, aadhaar_no=aadhaar_no, crop=crop_name, chosen_shc_id=chosen_shc_id,
+                                           session_id=session_id)
+    elif intent == "scheme":
+        response = await arun_scheme_agent(query=query, aadhaar_no=aadhaar_no)
+    else:
+        response = {"status": "error", "message": f"Intent '{intent}' not handled yet."}
+
+    return JSONResponse({
+        "aadhaar_no": aadhaar_no,
+        "query": query,
+        "intent": intent,
+        "chosen_shc_id": chosen_shc_id,
+        "response": response
+    })
+
+def _sse(delta: StreamDelta) -> Dict[str, str]:
+    return {"event": delta.delta_type, "data": delta.model_dump_json()}
+
+async def _query_events(aadhaar_no: str, query: str, chosen_shc_id, session_id):
+    started = time.perf_counter()
+    try:
+        intent_result, _ = await asyncio.gather(aclassify_intent(query), _prefetch_farmer(aadhaar_no))
+        intent = intent_result.intent
+        crop_name = intent_result.crop_name
+        yield _sse(StreamDelta(content=intent, delta_type="intent", metadata={
+            "aadhaar_no": aadhaar_no, "query": query, "chosen_shc_id": chosen_shc_id, "crop_name": crop_name
+        }))
+
+        if intent == "pre-sowing":
+            stream = astream_crop_agent(user_query=query, aadhaar_no=aadhaar_no, chosen_shc_id=chosen_shc_id)
+        elif intent == "sowing":
+            stream = astream_sowing_agent(query=query, aadhaar_no=aadhaar_no, crop=crop_name, chosen_shc_id=chosen_shc_id,
+                                          session_id=session_id)
+        elif intent == "scheme":
+            stream = astream_scheme_agent(query=query, aadhaar_no=aadhaar_no)
+        else:
+            stream = None
+            yield _sse(StreamDelta(content=f"Intent '{intent}' not handled yet.", delta_type="error"))
+
+        if stream is not None:
+            async for delta in stream:
+                yield _sse(delta)
+    except Exception as e:
+        # Headers are already sent, so failures are reported in-band
+        print("Streaming query failed:", e)
+        yield _sse(StreamDelta(content=str(e), delta_type="error"))
+    yield _sse(StreamDelta(delta_type="end", metadata={"elapsed_ms": (time.perf_counter() - started) * 1000}))
+
+async def handle_query_stream(request: Request):
+    """
+    Server-Sent Events variant of handle_query for slow connections.
+    Same JSON input; emits StreamDelta events as soon as each stage finishes:
+        intent -> data (structured recommendations) -> text deltas -> data (metrics) -> end
+    Errors after the stream has started arrive as an "error" event followed by "end".
+    """
+    data, error = await _query_params(request)
+    if error:
+        return error
+    return EventSourceResponse(_query_events(data["aadhaar_no"], data["query"], data.get("chosen_shc_id"),
+                                             data.get("session_id")))
+
+routes = [
+    Route("/query", handle_query, methods=["POST"]),
+    Route("/query/stream", handle_query_stream, methods=["POST"]),
+]
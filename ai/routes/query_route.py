@@ -3,7 +3,7 @@ from typing import Optional
 from agents.intent_model import classify_intent
 from agents.presowing_agent import run_crop_agent
 from agents.sowing_agent import run_sowing_agent
-from agents.scheme_model import rag_agent
+from agents.scheme_model import run_scheme_agent
 
 query_bp = Blueprint("query_bp", __name__)
 
@@ -17,7 +17,8 @@ def handle_query():
         {
             "aadhaar_no": "<AADHAAR_NUMBER>",
             "query": "<USER_QUERY>",
-            "chosen_shc_id": "<OPTIONAL_SHC_ID>"
+            "chosen_shc_id": "<OPTIONAL_SHC_ID>",
+            "session_id": "<OPTIONAL_SESSION_ID>"
         }
     
     Returns:
@@ -27,6 +28,7 @@ def handle_query():
     aadhaar_no = data.get("aadhaar_no")
     query = data.get("query")
     chosen_shc_id = data.get("chosen_shc_id")  # Optional SHC selection
+    session_id = data.get("session_id")  # Optional conversation id, scoped to the farmer
 
     if not aadhaar_no or not query:
         return jsonify({"error": "aadhaar_no and query required"}), 400
@@ -40,9 +42,10 @@ def handle_query():
     if intent == "pre-sowing":
         response = run_crop_agent(user_query=query, aadhaar_no=aadhaar_no, chosen_shc_id=chosen_shc_id)
     elif intent == "sowing":
-        response = run_sowing_agent(query=query, aadhaar_no=aadhaar_no, crop=crop_name, chosen_shc_id=chosen_shc_id)
+        response = run_sowing_agent(query=query, aadhaar_no=aadhaar_no, crop=crop_name, chosen_shc_id=chosen_shc_id,
+                                    session_id=session_id)
     elif intent == "scheme":
-        response = rag_agent.run(query=query)
+        response = run_scheme_agent(query=query, aadhaar_no=aadhaar_no)
     else:
         response = {"status": "error", "message": f"Intent '{intent}' not handled yet."}
 
@@ -0,0 +1,37 @@
+import asyncio
+import os
+
+os.environ.setdefault("DATABASE_URL", "postgresql://localhost/test")
+
+from agents.scheme_helpers.embedding_cache import EmbeddingCache
+
+
+def test_cancelled_owner_hands_load_to_waiter():
+    async def scenario():
+        cache = EmbeddingCache(backend="memory")
+        started = asyncio.Event()
+        calls = []
+
+        async def slow_embed(text):
+            calls.append(text)
+            started.set()
+            await asyncio.sleep(10)
+            return [1.0, 2.0]
+
+        async def fast_embed(text):
+            calls.append(text)
+            return [1.0, 2.0]
+
+        owner = asyncio.create_task(cache.get("m", "Soil health card", slow_embed))
+        await started.wait()
+        waiter = asyncio.create_task(cache.get("m", "soil health card", fast_embed))
+        await asyncio.sleep(0)
+
+        owner.cancel()
+        vector = await asyncio.wait_for(waiter, timeout=1)
+        assert vector == [1.0, 2.0]
+        assert owner.cancelled()
+        assert len(calls) == 2
+        assert not cache._inflight
+
+    asyncio.run(scenario())
@@ -0,0 +1,9 @@
+from agents.geocode import CentroidTable
+
+
+def test_state_centroids_resolve_locally_with_aliases():
+    table = CentroidTable()
+    bihar = table.lookup(None, "Bihar")
+    assert bihar == {"lat": 25.0961, "lon": 85.3131}
+    assert table.state_centroid("Orissa") == table.state_centroid("Odisha") is not None
+    assert table.lookup(None, "Atlantis") is None
@@ -0,0 +1,23 @@
+import pytest
+
+from agents.intent_fastpath import _lexicon_classify
+
+
+@pytest.mark.parametrize("query", [
+    "Pre-sowing preparation for wheat?",
+    "What should I do before sowing cotton?",
+    "seed treatment before sowing paddy",
+])
+def test_before_sowing_queries_are_pre_sowing(query):
+    assert _lexicon_classify(query) == ("pre-sowing", 1.0)
+
+
+@pytest.mark.parametrize("query", ["How to sow wheat?", "When to sow paddy and what seed rate?"])
+def test_sowing_queries_are_sowing(query):
+    assert _lexicon_classify(query)[0] == "sowing"
+
+
+@pytest.mark.parametrize("query", ["sowing", "subsidy", "what crop, and when to sow"])
+def test_weak_or_mixed_evidence_is_not_confident(query):
+    verdict = _lexicon_classify(query)
+    assert verdict is None or verdict[1] < 0.75
@@ -0,0 +1,39 @@
+import asyncio
+
+from agents.session_memory import SessionMemoryStore, session_key, _persisted_user_id
+
+
+def test_farmers_sharing_a_session_id_keep_separate_histories():
+    store = SessionMemoryStore(backend="memory")
+    first = store.get("111122223333", "shared-session")
+    store.save(first, "When should I sow wheat?", "Sow wheat in November.")
+
+    second = store.get("444455556666", "shared-session")
+    assert second is not first
+    assert second.messages() == []
+    assert len(store.get("111122223333", "shared-session").messages()) == 2
+
+
+def test_session_id_equal_to_another_farmers_aadhaar_does_not_reach_their_history():
+    store = SessionMemoryStore(backend="memory")
+    store.save(store.get("111122223333"), "Advice for paddy?", "Transplant paddy in July.")
+
+    assert store.get("444455556666", "111122223333").messages() == []
+
+
+def test_async_lookup_uses_the_same_composite_key():
+    store = SessionMemoryStore(backend="memory")
+
+    async def scenario():
+        history = await store.aget("111122223333", "s1")
+        await store.asave(history, "Maize sowing?", "Sow maize in June.")
+        return (await store.aget("111122223333", "s1")), (await store.aget("444455556666", "s1"))
+
+    own, other = asyncio.run(scenario())
+    assert len(own.messages()) == 2
+    assert other.messages() == []
+
+
+def test_persisted_user_ids_are_unambiguous():
+    assert _persisted_user_id(session_key("1", "2:3")) != _persisted_user_id(session_key("1:2", "3"))
+    assert _persisted_user_id(session_key("111122223333", "s1")) != _persisted_user_id(session_key("444455556666", "s1"))
@@ -0,0 +1,28 @@
+from agents.weather_cache import WeatherCache
+
+PAYLOAD = {"current": {"main": {"temp": 30.0}}, "forecast": {"list": [{"main": {"temp": 29.0, "humidity": 70}}]}}
+
+
+class BrokenStore:
+    def get(self, key, default=None):
+        raise OSError("database is locked")
+
+    def set(self, key, value):
+        raise OSError("attempt to write a readonly database")
+
+    def delete(self, key):
+        raise OSError("database disk image is malformed")
+
+
+def test_failing_disk_store_falls_back_to_memory(monkeypatch):
+    cache = WeatherCache(persist_path=None)
+    cache._store = BrokenStore()
+    calls = []
+    monkeypatch.setattr(cache, "_fetch", lambda cell, api_key: calls.append(cell) or PAYLOAD)
+
+    assert cache.get(18.5, 73.8, "key") == PAYLOAD
+    assert cache.get(18.5, 73.8, "key") == PAYLOAD  # served from memory
+    assert len(calls) == 1
+    assert cache.stats()["store_errors"] >= 2
+
+    cache.invalidate(18.5, 73.8)
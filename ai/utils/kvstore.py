@@ -0,0 +1,57 @@
+import os, json, sqlite3, threading, time
+from typing import Any, Iterator, Optional, Tuple
+
+class KVStore:
+    """
+    Small SQLite-backed key/value store with JSON values.
+    Used to persist local caches (weather, geocodes, ...) across restarts.
+    The connection is opened lazily and per-process, so it is safe to create at import time in forked workers.
+    """
+
+    def __init__(self, path: str, table: str = "kv"):
+        self.path = path
+        self.table = table
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            row = self._connection().execute(
+                f"SELECT value FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set(self, key: str, value: Any):
+        payload = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._connection().execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, updated_at) VALUES (?, ?, ?)",
+                (key, payload, time.time())
+            )
+
+    def delete(self, key: str):
+        with self._lock:
+            self._connection().execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        with self._lock:
+            rows = self._connection().execute(f"SELECT key, value FROM {self.table}").fetchall()
+        for key, value in rows:
+            yield key, json.loads(value)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection().execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
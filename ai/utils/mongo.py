@@ -1,17 +1,11 @@
-from pymongo import MongoClient
-from config import MONGO_URI, DB_NAME
-
-client = MongoClient(MONGO_URI)
-db = client[DB_NAME]
+# Thin compatibility wrapper over db.py so there is one Mongo client and one farmer cache.
+from db import client, db, get_user_and_shc as _get_user_and_shc, invalidate_farmer
 
 def get_user_and_shc(aadhaar_no: str, shc_chosen: str = None):
-    user = db["aadhar"].find_one({"AADHAAR_NO": aadhaar_no}, {"_id": 0})
-    if not user:
-        return {"error": f"No user found with Aadhaar: {aadhaar_no}"}
-
-    shc_query = {"AADHAAR_NO": int(aadhaar_no)}
-    if shc_chosen:
-        shc_query["SURVEY_NO"] = shc_chosen
-    shcs = list(db["shc_norm"].find(shc_query, {"_id": 0}))
+    res = _get_user_and_shc(aadhaar_no, shc_chosen)
+    if "error" in res:
+        return res
 
-    return {"user": user, "shc_details": shcs if shcs else []}
\ No newline at end of file
+    # This module has always returned [] rather than a message when there are no SHCs
+    shcs = res["shc_details"]
+    return {"user": res["user"], "shc_details": shcs if isinstance(shcs, list) else []}